@@ -26,8 +26,9 @@ from .errors import ExtensionDisabledGuild
 from .ext.commands import Cog, Cog as _Cog
 from .functions import *
 from .help import HelpCommand
+from .http import WebClient
 from .types import SupportsWrite
-from .utils import TaskKeeper, protect
+from .utils import BulkExecutor, TaskKeeper, protect
 from .utils.extensions import parent_package_path, walk_extensions
 
 __all__ = ['BotClient']
@@ -61,6 +62,7 @@ class BotClient(commands.Bot):
     _runner: Task | None
     latest_message: Message | None
     aiohttp_session: ClientSession | None
+    web_client: WebClient | None  # per-host limited wrapper of aiohttp_session, for extensions
     task_keeper: TaskKeeper | None
     process_pool: ProcessPoolExecutor | None
     configs: ConfigDict
@@ -112,6 +114,7 @@ class BotClient(commands.Bot):
         # Additional utility stuff
         self.latest_message = None
         self.aiohttp_session = None
+        self.web_client = None
         self.task_keeper = None
         self.process_pool = None
         if self._process_count > 0:
@@ -149,7 +152,9 @@ class BotClient(commands.Bot):
         await self.load_extensions_in(import_module('..builtins', self.__module__))  # loads builtin extensions
         n = await self.load_extensions_in(self._ext_module)  # loads custom extensions
 
-        self.aiohttp_session = ClientSession(loop=self.loop)
+        # one tuned session shared by all extensions, so they share warm connections
+        self.web_client = WebClient.from_config(self.configs['http'])
+        self.aiohttp_session = self.web_client.session
 
         # call async initializers for any cogs that have them
         tasks = []
@@ -455,9 +460,11 @@ class BotClient(commands.Bot):
 
         # ========== Update Guild Invite Link ========== #
 
-        # concurrently gather invites for speedups with multiple guilds
-        tasks = [guild.invites() for guild in guilds]
-        guild_invites: list[list[Invite] | BaseException] = await gather(*tasks, return_exceptions=True)
+        # gather invites a few guilds at a time for speedups without tripping the global rate limit
+        res = await BulkExecutor(concurrency=5).map(lambda guild: guild.invites(), guilds, route=lambda guild: guild.id)
+        guild_invites: list[list[Invite] | BaseException] = res.results  # type: ignore
+        for i, error in res.errors:
+            guild_invites[i] = error
 
         for guild, invites in zip(guilds, guild_invites):
             self.guild_configs[guild.id]['guild']['name'] = guild.name
@@ -612,6 +619,7 @@ class BotClient(commands.Bot):
         self._running = False
         self._runner = None
         self.aiohttp_session = None
+        self.web_client = None
         self.task_keeper = None
 
         # the process pool and extensions have to be reinitialized because they get shut down/unloaded
@@ -0,0 +1,56 @@
+"""Commands for inspecting the bot's outbound HTTP traffic."""
+
+from typing import TYPE_CHECKING
+
+from discord.ext.commands import Context, command
+
+from ..ext.commands.checks import has_global_perms
+from ..ext.commands.cog import Cog
+from ..functions import batch
+
+if TYPE_CHECKING:
+    from ..botclient import BotClient
+
+
+class HttpStats(Cog):
+    def __init__(self, bot: 'BotClient'):
+        self.bot = bot
+
+    @command(hidden=True)
+    @has_global_perms(owner=True)
+    async def httpstats(self, ctx: Context):
+        """shows request counts, latency, bytes and limiter state for each host the bot talks to"""
+        if self.bot.web_client is None:
+            await ctx.reply('The HTTP client is not running.')
+            return
+        traffic = self.bot.web_client.traffic()
+        limits = self.bot.web_client.metrics()
+        if not traffic and not limits:
+            await ctx.reply('No HTTP requests made yet.')
+            return
+
+        msg = '__**HTTP traffic by host**__:\n'
+        for host in sorted(traffic.keys() | limits.keys(), key=lambda h: -traffic[h].requests if h in traffic else 0):
+            msg += f'**``{host or "?"}``**\n'
+            if (t := traffic.get(host)) is not None:
+                statuses = ', '.join(f'{code}: {n}' for code, n in sorted(t.statuses.items())) or 'none'
+                msg += (f'``  {t.requests} requests ({statuses}; {t.errors} errors), '
+                        f'avg {t.avg_latency * 1000:.0f} ms, {t.bytes_sent / 1024:.1f} KiB sent, '
+                        f'{t.bytes_received / 1024:.1f} KiB received, '
+                        f'{t.connections_reused} reused / {t.connections_created} new connections``\n')
+            if (m := limits.get(host)) is not None:
+                msg += (f'``  circuit {m.state}, {m.in_flight} in flight, {m.throttled} throttled, '
+                        f'{m.rejected} rejected, {m.failures} failures``\n')
+
+        if (cache := self.bot.web_client.cache) is not None:
+            stats = cache.stats()
+            msg += (f'**Disk cache**: ``{stats["entries"]} bodies ({stats["size"] / 1024 ** 2:.1f} MiB), '
+                    f'{stats["revalidated"]} served from disk, {stats["bytes_saved"] / 1024 ** 2:.1f} MiB saved, '
+                    f'{stats["evicted"]} evicted``\n')
+
+        for chunk in batch(msg):
+            await ctx.reply(chunk)
+
+
+async def setup(bot: 'BotClient'):
+    await bot.add_cog(HttpStats(bot))
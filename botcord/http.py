@@ -0,0 +1,380 @@
+"""
+Outbound HTTP for extensions.
+
+``WebClient`` wraps the bot's shared ``aiohttp.ClientSession`` with, for each host that has limits configured:
+ - a token bucket (requests per second, with bursts)
+ - a cap on requests in flight
+ - a circuit breaker that fails fast after repeated errors, and lets a single probe through once it cools down
+ - metrics of all the above
+
+``WebClient.from_config()`` also builds the session itself from the ``http`` section of the global config
+(connection pool limits, DNS cache, keep-alive, default timeouts),
+with a ``TrafficTracer`` recording request counts, latency, bytes and connection reuse per host,
+and optionally a ``DiskCache`` for ``WebClient.get_cached()``.
+"""
+
+import asyncio
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from time import monotonic
+from types import SimpleNamespace, TracebackType
+from typing import Any, Literal
+from urllib.parse import urlsplit
+
+from aiohttp import (ClientError, ClientResponse, ClientResponseError, ClientSession, ClientTimeout, TCPConnector,
+                     TraceConfig, TraceConnectionCreateEndParams, TraceConnectionReuseconnParams,
+                     TraceRequestChunkSentParams, TraceRequestEndParams, TraceRequestExceptionParams,
+                     TraceRequestStartParams, TraceResponseChunkReceivedParams)
+
+from .http_cache import CachedResponse, DiskCache
+
+__all__ = ['WebClient', 'CircuitOpenError', 'HostLimits', 'HostMetrics', 'TrafficTracer', 'TrafficMetrics']
+
+
+class CircuitOpenError(ClientError):
+    """Raised instead of making a request to a host whose circuit breaker is open."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f'Circuit for {host} is open; not retrying for another {retry_in:.1f}s')
+        self.host = host
+        self.retry_in = retry_in
+
+
+@dataclass(frozen=True)
+class HostLimits:
+    rate: float = 10.  # requests per second...
+    burst: int = 20  # ...with up to this many at once after being idle
+    max_in_flight: int = 8
+    failure_threshold: int = 5  # consecutive failures that open the circuit
+    reset_timeout: float = 30.  # seconds the circuit stays open before a probe is let through
+
+
+@dataclass
+class HostMetrics:
+    requests: int = 0
+    failures: int = 0  # connection errors, timeouts, 429 and 5xx
+    rejected: int = 0  # failed fast because the circuit was open
+    throttled: int = 0  # had to wait for the token bucket
+    in_flight: int = 0
+    total_latency: float = 0.  # seconds, from sending to receiving the response headers
+    state: Literal['closed', 'open', 'half-open'] = 'closed'
+
+    @property
+    def avg_latency(self) -> float:
+        done = self.requests - self.in_flight
+        return self.total_latency / done if done > 0 else 0.
+
+
+@dataclass
+class TrafficMetrics:
+    requests: int = 0
+    errors: int = 0  # requests that raised instead of getting a response
+    statuses: dict[int, int] = field(default_factory=dict)  # status code: count
+    total_latency: float = 0.  # seconds, until the response headers arrived (or the request failed)
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    connections_created: int = 0
+    connections_reused: int = 0
+
+    @property
+    def avg_latency(self) -> float:
+        done = sum(self.statuses.values()) + self.errors
+        return self.total_latency / done if done else 0.
+
+
+class TrafficTracer:
+    """Collects ``TrafficMetrics`` per host through aiohttp's tracing hooks."""
+
+    def __init__(self):
+        self.hosts: dict[str, TrafficMetrics] = {}
+
+    def _host(self, host: str | None) -> TrafficMetrics:
+        if (metrics := self.hosts.get(host or '')) is None:
+            metrics = self.hosts[host or ''] = TrafficMetrics()
+        return metrics
+
+    def trace_config(self) -> TraceConfig:
+        trace = TraceConfig()
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_request_end.append(self._on_request_end)
+        trace.on_request_exception.append(self._on_request_exception)
+        trace.on_request_chunk_sent.append(self._on_request_chunk_sent)
+        trace.on_response_chunk_received.append(self._on_response_chunk_received)
+        trace.on_connection_create_end.append(self._on_connection_create_end)
+        trace.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        return trace
+
+    # per-request context (ctx) keeps the host and start time, since not every hook gets the url
+
+    async def _on_request_start(self, _, ctx: SimpleNamespace, params: TraceRequestStartParams):
+        ctx.host = params.url.host
+        ctx.start = monotonic()
+        self._host(ctx.host).requests += 1
+
+    async def _on_request_end(self, _, ctx: SimpleNamespace, params: TraceRequestEndParams):
+        metrics = self._host(ctx.host)
+        metrics.total_latency += monotonic() - ctx.start
+        metrics.statuses[params.response.status] = metrics.statuses.get(params.response.status, 0) + 1
+
+    async def _on_request_exception(self, _, ctx: SimpleNamespace, params: TraceRequestExceptionParams):
+        metrics = self._host(ctx.host)
+        metrics.total_latency += monotonic() - ctx.start
+        metrics.errors += 1
+
+    async def _on_request_chunk_sent(self, _, ctx: SimpleNamespace, params: TraceRequestChunkSentParams):
+        self._host(ctx.host).bytes_sent += len(params.chunk)
+
+    async def _on_response_chunk_received(self, _, ctx: SimpleNamespace, params: TraceResponseChunkReceivedParams):
+        self._host(ctx.host).bytes_received += len(params.chunk)
+
+    async def _on_connection_create_end(self, _, ctx: SimpleNamespace, params: TraceConnectionCreateEndParams):
+        self._host(ctx.host).connections_created += 1
+
+    async def _on_connection_reuseconn(self, _, ctx: SimpleNamespace, params: TraceConnectionReuseconnParams):
+        self._host(ctx.host).connections_reused += 1
+
+
+class _Host:
+    def __init__(self, name: str, limits: HostLimits):
+        self.name = name
+        self.limits = limits
+        self.metrics = HostMetrics()
+        self.slots = asyncio.Semaphore(limits.max_in_flight)
+        self.tokens = float(limits.burst)
+        self.refilled = monotonic()
+        self.bucket_lock = asyncio.Lock()
+        self.failures = 0  # consecutive
+        self.opened_at = 0.
+        self.probing = False
+
+    async def take_token(self):
+        async with self.bucket_lock:
+            now = monotonic()
+            self.tokens = min(self.limits.burst, self.tokens + (now - self.refilled) * self.limits.rate)
+            self.refilled = now
+            if self.tokens < 1:
+                self.metrics.throttled += 1
+                await asyncio.sleep((1 - self.tokens) / self.limits.rate)
+                self.tokens = 1.
+                self.refilled = monotonic()
+            self.tokens -= 1
+
+    def check_circuit(self):
+        """raises CircuitOpenError unless a request may go through now"""
+        match self.metrics.state:
+            case 'open':
+                retry_in = self.opened_at + self.limits.reset_timeout - monotonic()
+                if retry_in > 0:
+                    self.metrics.rejected += 1
+                    raise CircuitOpenError(self.name, retry_in)
+                self.metrics.state = 'half-open'
+                self.probing = True  # this request is the probe
+            case 'half-open':
+                if self.probing:
+                    self.metrics.rejected += 1
+                    raise CircuitOpenError(self.name, 0.)
+                self.probing = True
+
+    def record(self, ok: bool):
+        self.probing = False
+        if ok:
+            self.failures = 0
+            self.metrics.state = 'closed'
+            return
+        self.failures += 1
+        self.metrics.failures += 1
+        if self.metrics.state == 'half-open' or self.failures >= self.limits.failure_threshold:
+            self.metrics.state = 'open'
+            self.opened_at = monotonic()
+
+
+class _WebRequest:
+    # usable both as ``async with client.get(...) as resp`` and ``resp = await client.get(...)``
+    def __init__(self, client: 'WebClient', method: str, url: str, kwargs: dict[str, Any]):
+        self.client = client
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+        self.host: _Host | None = None
+        self.resp: ClientResponse | None = None
+
+    async def _send(self) -> ClientResponse:
+        host = self.host = self.client.host(urlsplit(self.url).hostname or '')
+        if host is None:  # not limited
+            self.resp = await self.client.session.request(self.method, self.url, **self.kwargs)
+            return self.resp
+        host.check_circuit()  # before waiting for anything, to fail fast
+        await host.slots.acquire()
+        host.metrics.requests += 1
+        host.metrics.in_flight += 1
+        try:
+            await host.take_token()
+            start = monotonic()
+            try:
+                self.resp = await self.client.session.request(self.method, self.url, **self.kwargs)
+            except (ClientError, asyncio.TimeoutError) as e:
+                host.record(isinstance(e, ClientResponseError) and not _is_failure(e.status))
+                raise
+            finally:
+                host.metrics.total_latency += monotonic() - start
+            host.record(not _is_failure(self.resp.status))
+            return self.resp
+        except BaseException:
+            if host.probing:
+                host.probing = False  # cancelled mid-probe; let the next request probe instead
+            self._release()
+            raise
+
+    def _release(self):
+        if self.host is not None:
+            self.host.metrics.in_flight -= 1
+            self.host.slots.release()
+            self.host = None
+
+    def __await__(self):
+        return self._await().__await__()
+
+    async def _await(self) -> ClientResponse:
+        try:
+            return await self._send()
+        finally:
+            self._release()  # without a context manager, the slot is only held until the headers arrive
+
+    async def __aenter__(self) -> ClientResponse:
+        return await self._send()
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, exc: BaseException | None,
+                        tb: TracebackType | None):
+        try:
+            if self.resp is not None:
+                self.resp.release()
+        finally:
+            self._release()
+
+
+def _is_failure(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+class WebClient:
+    """
+    Per-host limited wrapper around a ``ClientSession``.
+
+    Has the same ``request()``/``get()``/``post()``/... methods as the session, and hands everything else
+    (``closed``, ``cookie_jar``, ...) through to it.
+
+    :param limits: limits for every host not in ``overrides``; by default, other hosts aren't limited at all
+    :param overrides: limits for specific hosts (by host name)
+    :param cache: disk cache for ``get_cached()``; without one, it just makes plain requests
+    """
+
+    def __init__(self, session: ClientSession, limits: HostLimits | None = None,
+                 overrides: Mapping[str, HostLimits] | None = None, tracer: 'TrafficTracer | None' = None,
+                 cache: DiskCache | None = None):
+        self.session = session
+        self.limits = limits
+        self.overrides = dict(overrides or {})
+        self.tracer = tracer  # only if the session was set up with its trace config
+        self.cache = cache
+        self._hosts: dict[str, _Host] = {}
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> 'WebClient':
+        """
+        Creates the session and its client from the ``http`` section of the global config.
+        Must be called inside a running event loop.
+        """
+        timeout = config.get('timeout') or {}
+        connector = TCPConnector(
+                limit=config.get('limit', 100),
+                limit_per_host=config.get('limit_per_host', 0),
+                ttl_dns_cache=config.get('dns_cache_ttl', 10),
+                use_dns_cache=config.get('dns_cache_ttl', 10) is not None,
+                keepalive_timeout=config.get('keepalive_timeout', 15),
+        )
+        tracer = TrafficTracer()
+        session = ClientSession(
+                connector=connector,
+                timeout=ClientTimeout(total=timeout.get('total'), connect=timeout.get('connect'),
+                                      sock_read=timeout.get('sock_read')),
+                trace_configs=[tracer.trace_config()],
+        )
+
+        # limits are opt-in per host, since one set of them can't suit every host (Discord's CDN, scraped sites...)
+        hosts = dict(config.get('hosts') or {})
+        default = hosts.pop('default', None)
+        limits = HostLimits(**default) if default is not None else None
+        overrides = {name: HostLimits(**{**vars(limits or HostLimits()), **(values or {})})
+                     for name, values in hosts.items()}
+
+        cache = None
+        if (cache_conf := config.get('cache') or {}).get('enabled'):
+            cache = DiskCache(cache_conf.get('dir', 'http_cache'), int(cache_conf.get('max_mb', 50) * 1024 ** 2))
+        return cls(session, limits, overrides, tracer, cache)
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self.session, item)
+
+    def host(self, name: str) -> _Host | None:
+        """the limiter for host ``name``; None if it isn't limited"""
+        if (host := self._hosts.get(name)) is None:
+            if (limits := self.overrides.get(name, self.limits)) is None:
+                return None
+            host = self._hosts[name] = _Host(name, limits)
+        return host
+
+    def metrics(self) -> dict[str, HostMetrics]:
+        return {name: host.metrics for name, host in self._hosts.items()}
+
+    def traffic(self) -> dict[str, TrafficMetrics]:
+        return dict(self.tracer.hosts) if self.tracer is not None else {}
+
+    def request(self, method: str, url: str, **kwargs) -> _WebRequest:
+        return _WebRequest(self, method, str(url), kwargs)
+
+    def get(self, url: str, **kwargs) -> _WebRequest:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> _WebRequest:
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> _WebRequest:
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> _WebRequest:
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> _WebRequest:
+        return self.request('DELETE', url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> _WebRequest:
+        return self.request('HEAD', url, **kwargs)
+
+    async def get_cached(self, url: str, **kwargs) -> CachedResponse:
+        """
+        GET that reads the whole body, revalidating against the disk cache (if configured):
+        a stored copy is sent with ``If-None-Match``/``If-Modified-Since``, and a ``304`` is answered from disk.
+
+        Keyword arguments are passed on to ``get()``; the url (with any query) is the cache key.
+        """
+        if self.cache is None:
+            async with self.get(url, **kwargs) as resp:
+                return CachedResponse(str(resp.url), resp.status, resp.reason, resp.headers, await resp.read())
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        conditional = {**headers, **await self.cache.validators(url)}
+        async with self.get(url, headers=conditional, **kwargs) as resp:
+            if resp.status == 304:
+                if (cached := await self.cache.read(url)) is not None:
+                    return cached
+                stale = True  # evicted or deleted in the meantime
+            else:
+                stale = False
+                body = await resp.read()
+                if resp.status == 200:
+                    await self.cache.store(url, body, resp.headers)
+                response = CachedResponse(str(resp.url), resp.status, resp.reason, resp.headers, body)
+        if stale:
+            await self.cache.forget(url)
+            return await self.get_cached(url, headers=headers, **kwargs)
+        return response
@@ -0,0 +1,193 @@
+"""
+On-disk cache for conditional HTTP requests.
+
+Response bodies that came with an ``ETag`` or ``Last-Modified`` header are kept on disk,
+so the next request for the same url can ask the server whether anything changed
+(``If-None-Match``/``If-Modified-Since``) and use the stored body when it answers ``304 Not Modified``.
+Total size is kept under a budget by evicting the least recently used bodies.
+
+Used through ``WebClient.get_cached()``; see ``botcord.http``.
+"""
+
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from hashlib import sha256
+from time import time
+from typing import Any
+
+__all__ = ['DiskCache', 'CachedResponse']
+
+
+@dataclass
+class _Entry:
+    url: str
+    size: int
+    used: float  # unix time of last use, for LRU eviction
+    etag: str | None = None
+    last_modified: str | None = None
+    content_type: str | None = None
+
+
+@dataclass
+class CachedResponse:
+    """A fully read response, either fresh from the server or revalidated from the disk cache."""
+    url: str
+    status: int
+    reason: str | None
+    headers: Mapping[str, str]
+    body: bytes
+    from_cache: bool = False
+
+    @property
+    def charset(self) -> str:
+        _, _, params = (self.headers.get('Content-Type') or '').partition(';')
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'charset' and value:
+                return value.strip('"')
+        return 'utf-8'
+
+    def text(self, encoding: str | None = None, errors: str = 'strict') -> str:
+        return self.body.decode(encoding or self.charset, errors)
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class DiskCache:
+    """
+    LRU store of response bodies and their validators, under ``max_bytes`` in total.
+
+    The index lives in memory (and in ``index.json`` in the cache directory, for restarts);
+    each body is its own file, named after the hash of its url.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 50 * 1024 ** 2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: OrderedDict[str, _Entry] | None = None  # key: entry, least recently used first
+        self._size = 0
+        self._lock = asyncio.Lock()
+
+        self.revalidated = 0  # 304s served from disk
+        self.stored = 0
+        self.evicted = 0
+        self.bytes_saved = 0  # body bytes that didn't have to be downloaded again
+
+    @staticmethod
+    def key(url: str) -> str:
+        return sha256(url.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.body')
+
+    def _load_index(self) -> OrderedDict[str, _Entry]:
+        os.makedirs(self.directory, exist_ok=True)
+        index = OrderedDict()
+        try:
+            with open(os.path.join(self.directory, 'index.json'), encoding='utf-8') as file:
+                saved = json.load(file)
+        except (FileNotFoundError, ValueError):
+            saved = {}
+        for key, values in sorted(saved.items(), key=lambda item: item[1].get('used', 0)):
+            if os.path.isfile(self._path(key)):
+                index[key] = _Entry(**values)
+        return index
+
+    def _save_index(self):
+        path = os.path.join(self.directory, 'index.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump({key: asdict(entry) for key, entry in self._index.items()}, file)
+        os.replace(path + '.tmp', path)
+
+    async def _ensure_loaded(self):
+        if self._index is None:
+            self._index = await asyncio.to_thread(self._load_index)
+            self._size = sum(entry.size for entry in self._index.values())
+
+    async def validators(self, url: str) -> dict[str, str]:
+        """conditional request headers for the stored copy of ``url`` (empty if there isn't one)"""
+        await self._ensure_loaded()
+        if (entry := self._index.get(self.key(url))) is None:
+            return {}
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    async def read(self, url: str) -> CachedResponse | None:
+        """the stored copy of ``url``, marked as just used; None if it's gone"""
+        await self._ensure_loaded()
+        key = self.key(url)
+        if (entry := self._index.get(key)) is None:
+            return None
+        try:
+            body = await asyncio.to_thread(_read_file, self._path(key))
+        except OSError:
+            await self.forget(url)
+            return None
+        entry.used = time()
+        self._index.move_to_end(key)
+        self.revalidated += 1
+        self.bytes_saved += len(body)
+        headers = {'Content-Type': entry.content_type} if entry.content_type else {}
+        return CachedResponse(url, 200, 'OK', headers, body, from_cache=True)
+
+    async def store(self, url: str, body: bytes, headers: Mapping[str, str]):
+        """keeps ``body`` if the response has validators to revalidate it with later"""
+        etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+        if not (etag or last_modified) or 'no-store' in (headers.get('Cache-Control') or ''):
+            return
+        if len(body) > self.max_bytes:
+            return
+        await self._ensure_loaded()
+        key = self.key(url)
+        async with self._lock:
+            await asyncio.to_thread(_write_file, self._path(key), body)
+            if (old := self._index.pop(key, None)) is not None:
+                self._size -= old.size
+            self._index[key] = _Entry(url, len(body), time(), etag, last_modified, headers.get('Content-Type'))
+            self._size += len(body)
+            self.stored += 1
+            evicted = []
+            while self._size > self.max_bytes and self._index:
+                old_key, old = self._index.popitem(last=False)
+                self._size -= old.size
+                evicted.append(self._path(old_key))
+            self.evicted += len(evicted)
+            await asyncio.to_thread(self._commit, evicted)
+
+    async def forget(self, url: str):
+        await self._ensure_loaded()
+        async with self._lock:
+            if (entry := self._index.pop(self.key(url), None)) is not None:
+                self._size -= entry.size
+                await asyncio.to_thread(self._commit, [self._path(self.key(url))])
+
+    def _commit(self, removed: list[str]):
+        for path in removed:
+            with suppress(FileNotFoundError):
+                os.remove(path)
+        self._save_index()
+
+    def stats(self) -> dict[str, int]:
+        return {'entries': len(self._index or ()), 'size': self._size, 'revalidated': self.revalidated,
+                'stored': self.stored, 'evicted': self.evicted, 'bytes_saved': self.bytes_saved}
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def _write_file(path: str, data: bytes):
+    with open(path + '.tmp', 'wb') as file:
+        file.write(data)
+    os.replace(path + '.tmp', path)
@@ -1,4 +1,5 @@
 from . import *
-from .concurrency import TaskKeeper
+from .cache import AsyncTTLCache
+from .concurrency import BulkExecutor, BulkResult, ByteSemaphore, TaskKeeper
 from .errors import protect
 from .safe_eval import MathParser
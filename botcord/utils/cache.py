@@ -0,0 +1,120 @@
+"""
+Caching utilities for async code.
+"""
+
+from asyncio import Task, create_task, shield
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from time import monotonic
+from typing import Generic, TypeVar
+
+__all__ = ['AsyncTTLCache']
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class AsyncTTLCache(Generic[K, V]):
+    """
+    Bounded LRU cache for values produced by coroutines.
+
+    - Concurrent ``get()`` calls for the same key share one in-flight load (single-flight).
+    - ``ttl`` may be a function of the value, so different values can live for different lengths of time.
+    - For ``stale_ttl`` seconds after expiring, a value is still served while it gets reloaded
+      in the background (stale-while-revalidate).
+    - Failed loads are not cached; they raise for everyone waiting on them,
+      except background refreshes, which just keep serving the stale value.
+
+    Example::
+
+        cache = AsyncTTLCache(maxsize=128, ttl=60)
+        value = await cache.get(key, lambda: fetch(key))
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float | Callable[[V], float] = 300., stale_ttl: float = 0.):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: OrderedDict[K, tuple[V, float]] = OrderedDict()  # key: (value, expiry time)
+        self._loading: dict[K, Task] = {}
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.coalesced = 0  # misses that joined a load already in flight
+        self.misses = 0
+        self.errors = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+    @property
+    def hit_rate(self) -> float:
+        """fraction of gets that didn't start a load of their own"""
+        total = self.hits + self.stale_hits + self.coalesced + self.misses
+        return (self.hits + self.stale_hits + self.coalesced) / total if total else 0.
+
+    def stats(self) -> dict[str, int | float]:
+        return {'size': len(self), 'hits': self.hits, 'stale_hits': self.stale_hits,
+                'coalesced': self.coalesced, 'misses': self.misses,
+                'errors': self.errors, 'in_flight': len(self._loading), 'hit_rate': self.hit_rate}
+
+    def fresh(self, key: K) -> bool:
+        """whether ``key`` has a value that hasn't expired yet (doesn't count as a hit or miss)"""
+        return (entry := self._entries.get(key)) is not None and monotonic() < entry[1]
+
+    def invalidate(self, key: K):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def put(self, key: K, value: V):
+        ttl = self.ttl(value) if callable(self.ttl) else self.ttl
+        self._entries[key] = (value, monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def _load(self, key: K, loader: Callable[[], Awaitable[V]]) -> V:
+        try:
+            value = await loader()
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._loading.pop(key, None)
+        self.put(key, value)
+        return value
+
+    def _start_load(self, key: K, loader: Callable[[], Awaitable[V]]) -> Task:
+        if (task := self._loading.get(key)) is None:
+            task = self._loading[key] = create_task(self._load(key, loader))
+            # background refreshes may never be awaited; don't let their errors be reported as unretrieved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def get(self, key: K, loader: Callable[[], Awaitable[V]]) -> V:
+        """Returns the cached value for ``key``, calling ``loader`` to (re)load it when needed."""
+        if (entry := self._entries.get(key)) is not None:
+            value, expires = entry
+            now = monotonic()
+            if now < expires:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            if now < expires + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._start_load(key, loader)
+                return value
+            del self._entries[key]
+
+        if key in self._loading:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        # shielded so that one cancelled caller doesn't cancel the load for everyone else
+        return await shield(self._start_load(key, loader))
@@ -2,13 +2,22 @@
 Utilities to help with concurrency problems.
 """
 
-from asyncio import AbstractEventLoop, CancelledError, Event, Task, sleep
-from collections.abc import Coroutine
-from contextlib import suppress
+from asyncio import AbstractEventLoop, CancelledError, Event, Future, Lock, Semaphore, Task, gather, \
+    get_running_loop, sleep
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Coroutine, Hashable, Sequence
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass, field
+from random import uniform
+from time import monotonic
+from typing import Generic, TypeVar
 from sys import __stderr__
 from traceback import print_exception
 
-__all__ = ['TaskKeeper']
+__all__ = ['TaskKeeper', 'ByteSemaphore', 'BulkExecutor', 'BulkResult', 'is_transient']
+
+T = TypeVar('T')
+I = TypeVar('I')
 
 
 class TaskKeeper:
@@ -70,3 +79,184 @@ class TaskKeeper:
         with suppress(CancelledError):
             self._awaiter.cancel()
         self._running = False
+
+
+class ByteSemaphore:
+    """
+    Semaphore that counts units (e.g. bytes) instead of holders,
+    so that the total size of whatever is in flight stays under ``limit``.
+
+    Waiters are served in FIFO order. A request for more than the whole limit
+    is clamped to it, so it runs alone instead of never.
+    """
+
+    def __init__(self, limit: int):
+        if limit <= 0:
+            raise ValueError('ByteSemaphore limit must be positive.')
+        self.limit = limit
+        self.in_use = 0
+        self._waiters: deque[tuple[int, Future]] = deque()
+
+    async def acquire(self, n: int) -> int:
+        """Waits until ``n`` units are free and takes them. Returns the amount actually taken."""
+        n = max(0, min(n, self.limit))
+        if not self._waiters and self.in_use + n <= self.limit:
+            self.in_use += n
+            return n
+
+        fut = get_running_loop().create_future()
+        self._waiters.append((n, fut))
+        try:
+            await fut
+        except CancelledError:
+            if fut.done() and not fut.cancelled():  # granted just as we got cancelled
+                self.release(n)
+            else:
+                with suppress(ValueError):
+                    self._waiters.remove((n, fut))
+                self._wake()
+            raise
+        return n
+
+    def release(self, n: int):
+        self.in_use -= n
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_use + self._waiters[0][0] <= self.limit:
+            n, fut = self._waiters.popleft()
+            if not fut.done():
+                self.in_use += n
+                fut.set_result(None)
+
+    @asynccontextmanager
+    async def hold(self, n: int) -> AsyncIterator[int]:
+        """Context manager version of acquire/release."""
+        n = await self.acquire(n)
+        try:
+            yield n
+        finally:
+            self.release(n)
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether an HTTP error is worth retrying (rate limited or a server-side failure)."""
+    status = getattr(error, 'status', None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+@dataclass
+class BulkResult(Generic[T]):
+    """Outcome of :meth:`BulkExecutor.map`. ``results`` is in input order, with None where the call failed."""
+    results: list[T | None]
+    errors: list[tuple[int, Exception]] = field(default_factory=list)  # (input index, error)
+
+    @property
+    def ok(self) -> list[T]:
+        failed = {i for i, _ in self.errors}
+        return [r for i, r in enumerate(self.results) if i not in failed]
+
+    def raise_first(self):
+        if self.errors:
+            raise self.errors[0][1]
+
+
+class _RouteBucket:
+    # sliding window of call start times, plus a pause after the route got rate limited
+    def __init__(self, rate: int, per: float):
+        self.rate = rate
+        self.per = per
+        self.calls: deque[float] = deque()
+        self.paused_until = 0.
+        self.lock = Lock()
+
+    async def wait(self):
+        async with self.lock:
+            while True:
+                now = monotonic()
+                while self.calls and now - self.calls[0] >= self.per:
+                    self.calls.popleft()
+                delay = self.paused_until - now
+                if len(self.calls) >= self.rate:
+                    delay = max(delay, self.calls[0] + self.per - now)
+                if delay <= 0:
+                    self.calls.append(now)
+                    return
+                await sleep(delay)
+
+
+class BulkExecutor:
+    """
+    Runs many REST calls with bounded concurrency instead of one big unbounded ``gather``.
+
+    Calls are grouped into routes (e.g. one per channel or guild), each with its own rate bucket
+    of ``route_rate`` calls per ``route_per`` seconds.
+    Transient failures (429/5xx by default) are retried with jittered exponential backoff,
+    honouring ``retry_after`` when the error has one. Everything else is collected, not raised,
+    so one bad call doesn't throw away the rest of the results.
+    """
+
+    def __init__(self, concurrency: int = 5, *, route_rate: int = 5, route_per: float = 1., retries: int = 3,
+                 base_delay: float = 0.5, max_delay: float = 30.,
+                 retry_if: Callable[[BaseException], bool] = is_transient):
+        self.concurrency = concurrency
+        self.route_rate = route_rate
+        self.route_per = route_per
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_if = retry_if
+        self._buckets: dict[Hashable, _RouteBucket] = {}
+
+    def _bucket(self, route: Hashable) -> _RouteBucket:
+        if (bucket := self._buckets.get(route)) is None:
+            bucket = self._buckets[route] = _RouteBucket(self.route_rate, self.route_per)
+        return bucket
+
+    async def _call(self, func: Callable[[I], Awaitable[T]], item: I, route: Hashable) -> T:
+        bucket = self._bucket(route)
+        attempt = 0
+        while True:
+            await bucket.wait()
+            try:
+                return await func(item)
+            except Exception as error:
+                if attempt >= self.retries or not self.retry_if(error):
+                    raise
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt) * uniform(0.5, 1.5)
+                if retry_after := getattr(error, 'retry_after', None):
+                    delay = max(delay, retry_after)
+                    bucket.paused_until = max(bucket.paused_until, monotonic() + retry_after)
+                await sleep(delay)
+                attempt += 1
+
+    async def map(self,
+                  func: Callable[[I], Awaitable[T]],
+                  items: Sequence[I],
+                  *,
+                  route: Callable[[I], Hashable] | None = None,
+                  progress: Callable[[int, int], Awaitable] | None = None) -> BulkResult[T]:
+        """
+        Calls ``func`` on every item and collects the results.
+
+        :param route: maps an item to its rate-limit route; all items share one route if not given
+        :param progress: awaited with (finished so far, total) after every call
+        """
+        result: BulkResult[T] = BulkResult([None] * len(items))
+        limit = Semaphore(self.concurrency)
+        done = 0
+
+        async def run(i: int, item: I):
+            nonlocal done
+            async with limit:
+                try:
+                    result.results[i] = await self._call(func, item, route(item) if route is not None else None)
+                except Exception as error:
+                    result.errors.append((i, error))
+            done += 1
+            if progress is not None:
+                await progress(done, len(items))
+
+        await gather(*(run(i, item) for i, item in enumerate(items)))
+        result.errors.sort(key=lambda e: e[0])
+        return result
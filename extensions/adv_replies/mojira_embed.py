@@ -1,13 +1,19 @@
 import asyncio
 import re
-from typing import Final, TYPE_CHECKING
+from collections.abc import Iterable
+from datetime import datetime
+from typing import Any, Final, TYPE_CHECKING
+
+from aiohttp import ClientError, ClientTimeout
 
-from bs4 import BeautifulSoup
 from discord import Embed, HTTPException, Message, NotFound
 from discord.ext.commands import Context, command
 from fake_useragent import UserAgent
 
 from botcord.ext.commands import Cog
+from botcord.functions import log
+from botcord.utils import AsyncTTLCache
+from .mojira_parse import IssueNotViewable, extract_issue
 
 if TYPE_CHECKING:
     from botcord import BotClient
@@ -92,6 +98,44 @@ if TYPE_CHECKING:
 # }
 
 
+def _dig(data: Any, *path: str | int) -> Any:
+    for key in path:
+        if data is None:
+            return None
+        data = data[key]
+    return data
+
+
+def _jira_date(value: str | None) -> str:
+    if not value:
+        return 'N/A'
+    # same format the issue page shows, e.g. 17/Aug/22 8:00 PM
+    date = datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f%z')
+    return f'{date:%d/%b/%y} {date.hour % 12 or 12}:{date:%M %p}'
+
+
+# embed field: how to get it out of a Jira REST API issue's "fields"
+API_FIELDS: Final = {
+    'title'     : lambda f: f['summary'],
+    'desc'      : lambda f: f.get('description') or '',
+    'status'    : lambda f: _dig(f, 'status', 'name'),
+    'issue_type': lambda f: _dig(f, 'issuetype', 'name'),
+    'resolution': lambda f: _dig(f, 'resolution', 'name') or 'Unresolved',
+    'fixed_ver' : lambda f: ', '.join(v['name'] for v in f.get('fixVersions') or ()) or 'None',
+    'created'   : lambda f: _jira_date(f.get('created')),
+    'updated'   : lambda f: _jira_date(f.get('updated')),
+    'resolved'  : lambda f: _jira_date(f.get('resolutiondate')),
+    'reporter'  : lambda f: _dig(f, 'reporter', 'displayName'),
+    'assignee'  : lambda f: _dig(f, 'assignee', 'displayName') or 'Unassigned',
+    'priority'  : lambda f: _dig(f, 'customfield_12200', 'value'),
+    'votes'     : lambda f: _dig(f, 'votes', 'votes'),
+    'watching'  : lambda f: _dig(f, 'watches', 'watchCount'),
+}
+# the Jira fields to ask the search API for
+API_FIELD_NAMES: Final = ('summary,description,status,issuetype,resolution,fixVersions,created,updated,'
+                          'resolutiondate,reporter,assignee,customfield_12200,votes,watches')
+
+
 class Mojira(Cog):
     COLORS: Final[dict[str, int]] = {  # matches a "resolution" to a color code (base 10)
         "N/A"              : int('000000', 16),
@@ -116,12 +160,27 @@ class Mojira(Cog):
         self.init_local_config(__file__)
         if 'use_fakeua' not in self.local_config:
             self.local_config['use_fakeua'] = False
+        default_cache = {'size': 512, 'stale': 600,
+                         'ttl': {'Unresolved': 120, 'Awaiting Response': 600, 'Fixed': 86400, 'default': 3600}}
+        default_cache.update(self.local_config.get('cache', {}))
+        self.local_config['cache'] = default_cache
+        default_api = {'enabled': True, 'base_url': 'https://bugs.mojang.com', 'timeout': 10}
+        default_api.update(self.local_config.get('api', {}))
+        self.local_config['api'] = default_api
+        # embeds by issue id; open issues change often, resolved ones hardly ever
+        self._embed_cache: AsyncTTLCache[str, dict] = AsyncTTLCache(
+                maxsize=default_cache['size'], ttl=self._embed_ttl, stale_ttl=default_cache['stale'])
 
     async def __init_async__(self):
         if self.local_config['use_fakeua']:
             # sometimes it takes a while to get the useragent data (such as no cache)
             self.fake_ua = await asyncio.to_thread(UserAgent)
 
+    def _embed_ttl(self, embed_data: dict) -> float:
+        ttls = self.local_config['cache']['ttl']
+        resolution = next((f['value'] for f in embed_data['fields'] if f['name'] == 'Resolution'), None)
+        return ttls.get(resolution, ttls['default'])
+
     def _get_ua(self):
         if self.fake_ua is None:
             return "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.159 Safari/537.36"
@@ -141,11 +200,8 @@ class Mojira(Cog):
         # remove duplicates and limit size to 3
         if not (issue_ids := list(set(issue_ids))[:3]):
             return
-        # get and generate embed data, concurrently
-        embed_dicts: tuple[dict | NotFound | HTTPException | ValueError, ...] = await asyncio.gather(
-                *(self.get_embed(issue_id) for issue_id in issue_ids),
-                return_exceptions=True
-        )
+        # get and generate embed data, in one search where possible
+        embed_dicts = await self.get_embeds(issue_ids)
 
         for embed_dict in embed_dicts:  # sends the embeds
             if not isinstance(embed_dict, dict):  # if embed_dict is not a dict, it's an exception
@@ -171,6 +227,14 @@ class Mojira(Cog):
             embed: Embed = Embed.from_dict(embed_data)
             await ctx.send(embed=embed)
 
+    @command(name='mojirastats', hidden=True)
+    async def _mojira_stats(self, ctx: Context):
+        """shows how well the mojira embed cache is doing"""
+        stats = self._embed_cache.stats()
+        await ctx.send(f'Mojira embed cache: {stats["size"]} issues cached, '
+                       f'{stats["hit_rate"]:.0%} hit rate ({stats["hits"]} hits, {stats["stale_hits"]} stale, '
+                       f'{stats["coalesced"]} coalesced, {stats["misses"]} misses, {stats["errors"]} errors)')
+
     # ========== GENERATOR FUNCTION ========== #
 
     async def get_embed(self, issue_id: str) -> dict:
@@ -185,39 +249,91 @@ class Mojira(Cog):
         if not re.fullmatch(r'MC-\d+', issue_id):  # only MC-x issues (no MCL, MCD, MCPE, etc.)
             raise ValueError(f"Obiously invalid mojira issue id: {issue_id}")
 
-        url = f'https://bugs.mojang.com/browse/{issue_id}'
+        return await self._embed_cache.get(issue_id, lambda: self._fetch_embed(issue_id))
+
+    async def get_embeds(self, issue_ids: Iterable[str]) -> list[dict | Exception]:
+        """like ``get_embed()``, but for many issues at once;
+        issues that aren't cached are looked up together in one search API request,
+        and anything the search couldn't provide falls back to the issue page.
+
+        exceptions are returned in place of the embeds that failed"""
+        issue_ids = list(issue_ids)
+        if self.local_config['api']['enabled']:
+            missing = [i for i in dict.fromkeys(issue_ids)
+                       if re.fullmatch(r'MC-\d+', i) and not self._embed_cache.fresh(i)]
+            if missing:
+                try:
+                    for issue_id, embed_data in (await self._search_embeds(missing)).items():
+                        self._embed_cache.put(issue_id, embed_data)
+                except (ClientError, asyncio.TimeoutError, KeyError, TypeError, ValueError) as e:
+                    log(f'Mojira search for {len(missing)} issues failed, falling back to pages: {e!r}', tag='Mojira')
+
+        return await asyncio.gather(*(self.get_embed(i) for i in issue_ids), return_exceptions=True)
+
+    async def _search_embeds(self, issue_ids: list[str]) -> dict[str, dict]:
+        """embeds for the issues found by one Jira search request (``key in (...)``);
+        ids that don't exist are just missing from the result"""
+        api = self.local_config['api']
+        params = {
+            'jql'          : f'key in ({",".join(issue_ids)})',
+            'fields'       : API_FIELD_NAMES,
+            'maxResults'   : str(len(issue_ids)),
+            'validateQuery': 'false',  # otherwise one nonexistent key fails the whole search
+        }
+        async with self.bot.web_client.get(f'{api["base_url"]}/rest/api/2/search', params=params,
+                                           headers={'User-Agent': self._get_ua()},
+                                           timeout=ClientTimeout(total=api['timeout'])) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+
+        embeds = {}
+        for issue in data['issues']:
+            fields = {name: str(value) if (value := get(issue['fields'])) is not None else 'N/A'
+                      for name, get in API_FIELDS.items()}
+            embeds[issue['key']] = self._build_embed(issue['key'], fields)
+        return embeds
+
+    async def _fetch_embed(self, issue_id: str) -> dict:
+        url = f'{self.local_config["api"]["base_url"]}/browse/{issue_id}'
         headers = {'User-Agent': self._get_ua()}
-        async with self.bot.aiohttp_session.get(url, headers=headers) as resp:
-            if resp.status == 404:
-                raise NotFound(resp, f"Mojira issue {issue_id} does not exist")
-            if resp.status != 200:
-                raise HTTPException(resp, f"Mojira issue {issue_id} returned status code {resp.status}")
-
-            html: str = await resp.text()
-        soup = BeautifulSoup(html, 'html.parser')
-        # IDK but non-existent issues may not have a 404 response code for whatever reason
-        # so, we check by html... requiring login basically means issue is not public or doesn't exist
-        if soup.select('.error-image-canNotBeViewed') or soup.select('form#login-form'):
+        # revalidated against the bot's disk cache (when enabled) instead of downloading unchanged pages again
+        resp = await self.bot.web_client.get_cached(url, headers=headers)
+        if resp.status == 404:
+            raise NotFound(resp, f"Mojira issue {issue_id} does not exist")  # type: ignore
+        if resp.status != 200:
+            raise HTTPException(resp, f"Mojira issue {issue_id} returned status code {resp.status}")  # type: ignore
+
+        html = resp.text(errors='replace')
+        # parsing big pages takes a while, keep it off the event loop
+        try:
+            if self.bot.process_pool is not None:
+                fields = await self.bot.to_process(extract_issue, html)
+            else:
+                fields = await asyncio.to_thread(extract_issue, html)
+        except IssueNotViewable:
+            # IDK but non-existent issues may not have a 404 response code for whatever reason
+            # so, we check by html... requiring login basically means issue is not public or doesn't exist
             raise NotFound(resp, f"Mojira issue {issue_id} does not exist")
 
-        def find(selector: str) -> str:
-            ele = soup.select_one(selector)
-            return ele.text.strip() if ele is not None else 'N/A'
-
-        title = find('h1#summary-val')
-        desc = find('div#description-val')[:100]
-        status = find('span#status-val')
-        issue_type = find('span#type-val')
-        resolution = find('span#resolution-val')
-        fixed_ver = find('span#fixfor-val')
-        created = find('span#created-val')
-        updated = find('span#updated-val')
-        resolved = find('span#resolutiondate-val')
-        reporter = find('span#reporter-val')
-        assignee = find('span#assignee-val')
-        priority = find('div#customfield_12200-val')
-        votes = find('aui-badge#vote-data')
-        watching = find('aui-badge#watcher-data')
+        return self._build_embed(issue_id, fields)
+
+    def _build_embed(self, issue_id: str, fields: dict[str, str]) -> dict:
+        """embed dict from the issue's fields (see ``mojira_parse.FIELDS``)"""
+        url = f'{self.local_config["api"]["base_url"]}/browse/{issue_id}'
+        title = fields['title']
+        desc = fields['desc'][:100]
+        status = fields['status']
+        issue_type = fields['issue_type']
+        resolution = fields['resolution']
+        fixed_ver = fields['fixed_ver']
+        created = fields['created']
+        updated = fields['updated']
+        resolved = fields['resolved']
+        reporter = fields['reporter']
+        assignee = fields['assignee']
+        priority = fields['priority']
+        votes = fields['votes']
+        watching = fields['watching']
         color: int = self.COLORS.get(resolution, int('000000', 16))
 
         embed_data = {
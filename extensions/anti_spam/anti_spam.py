@@ -6,21 +6,31 @@ AntiSpam V1
 import asyncio
 import re
 import time
+from collections import deque
+from collections.abc import Coroutine
 from contextlib import suppress
+from datetime import timedelta
 from typing import Final, Iterable, Optional, TYPE_CHECKING
 
-from discord import Embed, Forbidden, Member, Message
+from discord import Embed, Forbidden, Guild, HTTPException, Member, Message, TextChannel
 from discord.ext.commands import Context, group
 
 from botcord.errors import ExtensionDisabledGuild
+from botcord.functions import log
 from botcord.ext.commands import Cog, guild_admin_or_perms
+from botcord.utils import BulkExecutor
 from botcord.utils.errors import protect
+from .backends import StateBackend, make_backend
+from .dupe_index import DupeCluster, DupeIndex
+from .profiles import ScoringProfile, compile_profile, paraboly, sigmoidy
+from .raid import RaidState
 
 if TYPE_CHECKING:
     from botcord import BotClient
 
 # Antispam score calculation fine-tuning parameters.
 # Passed into non-linear functions. These numbers govern the behavior of antispam.
+# These are the defaults; guilds can override any of them under their ``scoring`` config (see profiles.py)
 X = {
     'Rep_Lin_Dec': 0.01,  # Reputation passive reset rate towards 0 (points-per-second)
 
@@ -41,31 +51,30 @@ X = {
 }
 
 
+_DISCORD_OBJ: Final = re.compile(r'<(:\w+:|@|#|@&)\d{18}>')
+THRESHOLDS: Final = ('flag_threshold', 'mute_threshold', 'unmute_reserve')
+
+
 class Tracker:
-    def __init__(self, member: Member, score: float = 0.0, mute_role_id=819097920368148501):
+    def __init__(self, member: Member, backend: StateBackend, mute_role_id=819097920368148501):
         self.member: Final = member
-        self._score: float = score
+        self.backend: Final = backend
+        self.rate: float = X['Rep_Lin_Dec']  # kept in sync with the guild's scoring profile by AntiSpam.tracker()
+        self.key: Final = backend.key(member.guild.id, member.id)
         self._history: list[Message] = list()
-        self._last_time: float = time.time()
         self.mute_role: Final = member.guild.get_role(mute_role_id)
         self.unmute_schedule: Optional[asyncio.Task] = None
+        self.mute_kind: Optional[str] = None  # 'role' or 'timeout', for mutes applied by this process
 
-    @property
-    def score(self) -> float:
-        offset = (time.time() - self._last_time) * X['Rep_Lin_Dec']
-        if offset > abs(self._score):
-            self._score = 0.0
-        elif self._score > 0:
-            self._score -= offset
-        else:
-            self._score += offset
+    async def get_score(self) -> float:
+        return await self.backend.get_score(self.key, self.rate)
 
-        self._last_time = time.time()
-        return self._score
+    async def add_score(self, delta: float) -> float:
+        """atomically adds to the score and returns the new score"""
+        return await self.backend.add_score(self.key, delta, self.rate)
 
-    @score.setter
-    def score(self, value: float):
-        self._score = value
+    async def set_score(self, value: float):
+        await self.backend.set_score(self.key, value)
 
     @property
     def history(self) -> list[Message]:
@@ -78,20 +87,20 @@ class Tracker:
 
     def _clear_unmute(self, _):
         if _ != self.unmute_schedule:
-            raise ValueError('something about the muting system completely bonked itself')
-        if not self.unmute_schedule.done():
-            raise ValueError('Unmute task has not completed yet but tried to remove reference')
+            return  # a newer schedule has replaced this one already
         self.unmute_schedule = None
 
-    def time_until_score(self, score: float) -> float:
+    async def time_until_score(self, score: float) -> float:
         """Estimates time in seconds for current score to naturally decay to a target value"""
-        if (self.score - score) * self.score < 0:  # Makes sure the target score is between the current score and 0
-            raise ValueError(f'A current score of {self.score} will never naturally decay to {score}')
+        current = await self.get_score()
+        if (current - score) * current < 0:  # Makes sure the target score is between the current score and 0
+            raise ValueError(f'A current score of {current} will never naturally decay to {score}')
 
-        return abs(self.score - score) / X['Rep_Lin_Dec']
+        return abs(current - score) / self.rate
 
     @property
     def muted(self) -> bool:
+        """whether *this process* has an unmute scheduled for the member"""
         if self.unmute_schedule is None:
             return False
         else:
@@ -99,46 +108,142 @@ class Tracker:
                 raise ValueError('Unmute scheduled task is done but reference was not removed.')
             return True
 
+    async def is_muted(self) -> bool:
+        """whether the member is muted by AntiSpam in any process sharing the state backend"""
+        return self.muted or await self.backend.get_mute_deadline(self.key) is not None
+
     async def mute(self, duration: float = 60.):
         if self.muted:
             raise ValueError('Tried to mute member that was already muted...???')
 
+        await self.backend.set_mute_deadline(self.key, time.time() + duration)
+
         async def unmute_scheduled_task():
-            await asyncio.sleep(duration)
+            # the deadline may be moved by another process in the meantime, so keep checking it
+            while (deadline := await self.backend.get_mute_deadline(self.key)) is not None:
+                await asyncio.sleep(max(deadline - time.time(), 0.))
             await self.member.remove_roles(self.mute_role, atomic=True)
 
         self.unmute_schedule = asyncio.create_task(unmute_scheduled_task())
         self.unmute_schedule.add_done_callback(self._clear_unmute)
+        self.mute_kind = 'role'
         await self.member.add_roles(self.mute_role, atomic=True)
 
+    async def timeout(self, duration: float = 60.):
+        """mutes using a Discord timeout instead of the mute role;
+        expires on its own, so no unmute needs to be scheduled"""
+        duration = min(duration, 27 * 24 * 3600.)  # Discord caps timeouts at 28 days
+        # only recorded once it worked, so that a failed timeout doesn't count as a mute
+        await self.member.timeout(timedelta(seconds=duration), reason='AntiSpam raid mitigation')
+        self.mute_kind = 'timeout'
+        await self.backend.set_mute_deadline(self.key, time.time() + duration)
+
     async def unmute(self):
-        if not self.muted:
+        if not await self.is_muted():
             raise ValueError('Tried to unmute member that was never muted...???')
 
-        if not self.unmute_schedule.done():
+        if self.unmute_schedule is not None and not self.unmute_schedule.done():
             self.unmute_schedule.cancel()
         self.unmute_schedule = None
-        await self.member.remove_roles(self.mute_role, atomic=True)
+        await self.backend.set_mute_deadline(self.key, None)
+        kind, self.mute_kind = self.mute_kind, None
+        # a mute applied by another process is of unknown kind; a timeout on the member is assumed to be ours
+        if kind == 'timeout' or (kind is None and self.member.is_timed_out()):
+            await self.member.timeout(None, reason='AntiSpam unmute')
+        if kind != 'timeout':
+            await self.member.remove_roles(self.mute_role, atomic=True)
 
 
 class AntiSpam(Cog):
-    @staticmethod
-    def sigmoidy(x, in_max=1., out_max=1.) -> float:
-        return (1 / (1 + 15.7 ** (-3 * (x / in_max) + 1.5))) * out_max if x != 0 else 0
-
-    @staticmethod
-    def paraboly(x, in_max=1., out_max=1.) -> float:
-        return min((1.1 * (x / in_max) + 0.3) ** 2.1 - 0.04, (x / in_max) + 1) * out_max if x != 0 else 0
+    sigmoidy = staticmethod(sigmoidy)
+    paraboly = staticmethod(paraboly)
 
     def __init__(self, bot: 'BotClient'):
         self.bot = bot
         self._trackers: dict[Member, Tracker] = dict()
+        self._dupe_indexes: dict[int, DupeIndex] = dict()
+        self._raids: dict[int, RaidState] = dict()
+        self._profiles: dict[int, ScoringProfile] = dict()  # compiled lazily, dropped on config changes
+        # reporting (log embeds, warnings) is deferred to a background worker so it never delays enforcement
+        # bounded, dropping the oldest reports first, so a flood can't pile them up without limit
+        self._reports: asyncio.Queue[Coroutine] = asyncio.Queue(maxsize=500)
+        self._report_worker: Optional[asyncio.Task] = None
+        self._action_times: deque[float] = deque(maxlen=200)  # seconds from message receipt to mute applied
         self.init_local_config(__file__)
 
         default_config = {'flag_threshold': -5, 'mute_threshold': -6.5, 'unmute_reserve': -0.3,
-                          'enabled_guilds': {}}
+                          'near_dupe': {}, 'raid': {}, 'backend': {'type': 'memory'}, 'enabled_guilds': {}}
         default_config.update(self.local_config)
         self.local_config.update(default_config)
+        self._backend: StateBackend = make_backend(self.local_config['backend'])
+
+        default_dupe = {'enabled': True, 'min_authors': 4, 'window': 30, 'threshold': 0.6,
+                        'capacity': 2048, 'penalty': -2.0}
+        default_dupe.update(self.local_config['near_dupe'])
+        self.local_config['near_dupe'].update(default_dupe)
+
+        default_raid = {'enabled': True, 'flag_count': 8, 'window': 10, 'duration': 300, 'batch_interval': 2,
+                        'concurrency': 5, 'slowmode': 10, 'lockdown': False}
+        default_raid.update(self.local_config['raid'])
+        self.local_config['raid'].update(default_raid)
+
+    async def __init_async__(self):
+        await self._backend.start()
+
+    async def cog_unload(self):
+        for raid in self._raids.values():
+            if raid.runner is not None:
+                raid.runner.cancel()  # restores any restricted channels on the way out
+        if self._report_worker is not None:
+            self._report_worker.cancel()
+            self._report_worker = None
+        while not self._reports.empty():  # never going to run; close them so they aren't reported as never awaited
+            self._reports.get_nowait().close()
+        with protect(name='AntiSpam backend closing'):
+            await self._backend.close()
+        await super().cog_unload()
+
+    async def _run_reports(self):
+        while True:
+            report = await self._reports.get()
+            with protect(compact=True, name='AntiSpam report'):
+                await report
+
+    def _defer(self, report: Coroutine):
+        """queue low-priority reporting work (runs one at a time, after enforcement)"""
+        # started here rather than in __init_async__, which doesn't run again when the extension is reloaded
+        if self._report_worker is None or self._report_worker.done():
+            self._report_worker = asyncio.create_task(self._run_reports())
+        if self._reports.full():
+            self._reports.get_nowait().close()
+        self._reports.put_nowait(report)
+
+    def tracker(self, member: Member) -> Tracker:
+        if member not in self._trackers:
+            self._trackers[member] = Tracker(member, self._backend)
+        tracker = self._trackers[member]
+        tracker.rate = self.profile(member.guild.id).rep_dec
+        return tracker
+
+    def profile(self, guild_id: int) -> ScoringProfile:
+        """the guild's compiled scoring profile (global defaults overridden by the guild's ``scoring`` config)"""
+        if (profile := self._profiles.get(guild_id)) is None:
+            overrides = (self.local_config['enabled_guilds'].get(guild_id) or {}).get('scoring') or {}
+            constants = {**X, **{k: v for k, v in overrides.items() if k in X}}
+            thresholds = {k: overrides.get(k, self.local_config[k]) for k in THRESHOLDS}
+            profile = self._profiles[guild_id] = compile_profile(constants, thresholds)
+        return profile
+
+    def invalidate_profiles(self, guild_id: int | None = None):
+        """drops compiled profiles so they get rebuilt from the current config"""
+        if guild_id is None:
+            self._profiles.clear()
+        else:
+            self._profiles.pop(guild_id, None)
+
+    def load_local_config(self):
+        super().load_local_config()
+        self.invalidate_profiles()
 
     @property
     def enabled_guids(self) -> Iterable[int]:
@@ -152,19 +257,46 @@ class AntiSpam(Cog):
             raise ExtensionDisabledGuild(f'AntiSpam is disabled for guild {msg.guild.name} ({msg.guild.id}).',
                                          name=type(self).__name__)
 
-        if msg.author not in self._trackers:
-            self._trackers[msg.author] = Tracker(msg.author)
-
+        received = time.perf_counter()
         data = await self._update_score(msg)
-        await self._process_score(msg.author, data_log=data, msg=msg)
+        await self._process_score(msg.author, data_log=data, msg=msg, received=received)
+
+        if self.local_config['near_dupe']['enabled']:
+            await self._check_dupes(msg)
+
+    def _dupe_index(self, guild_id: int) -> DupeIndex:
+        if guild_id not in self._dupe_indexes:
+            conf = self.local_config['near_dupe']
+            self._dupe_indexes[guild_id] = DupeIndex(capacity=conf['capacity'], threshold=conf['threshold'],
+                                                     window=conf['window'], min_authors=conf['min_authors'])
+        return self._dupe_indexes[guild_id]
+
+    async def _check_dupes(self, msg: Message):
+        """feeds the message into the guild's near-duplicate index
+        and penalizes everyone taking part in a copy-paste raid"""
+        cluster = self._dupe_index(msg.guild.id).add(msg.content, msg.author.id, msg.id,
+                                                     now=msg.created_at.timestamp())
+        if cluster is None:
+            return
+
+        if cluster.is_new:
+            self._defer(self._dupe_log(msg, cluster))
+
+        for author_id in cluster.new_author_ids:
+            member = msg.guild.get_member(author_id)
+            if member is None:
+                continue
+            await self.tracker(member).add_score(self.local_config['near_dupe']['penalty'])
+            await self._process_score(member)
 
     async def _update_score(self, msg: Message) -> \
             tuple[float, tuple[int, int, int, int, int, int, float, float, float, float, float, float, float]]:
-        tracker = self._trackers[msg.author]
+        tracker = self.tracker(msg.author)
+        profile = self.profile(msg.guild.id)
 
         msg_ascii = msg.content.encode('ascii', 'ignore').decode()
         non_asciis = len(msg.content) - len(msg_ascii)
-        disc_objs = len(re.findall(r'<(:\w+:|@|#|@&)\d{18}>', msg.content))
+        disc_objs = len(_DISCORD_OBJ.findall(msg.content))
         unique_mentions = set(msg.mentions)
         unique_mentions = list(filter(lambda x: x.id != msg.author.id and not x.bot, unique_mentions))
         unique_mentions += list(set(msg.role_mentions))
@@ -177,19 +309,19 @@ class AntiSpam(Cog):
         if msg.reference and msg.reference.cached_message and msg.reference.cached_message.author in msg.mentions:
             msg_men -= 1  # negate two ping-counts when someone is reply-mentioned and explicitly mentioned
 
-        scr_len = AntiSpam.sigmoidy(msg_len, X['Msg_Len_Scl'], X['Msg_Len_Mlt'])  # Message Text Length
-        scr_men = AntiSpam.paraboly(msg_men, X['Msg_Men_Scl'], X['Msg_Men_Mlt'])  # Message User/Role Mentions
-        scr_att = AntiSpam.sigmoidy(msg_att, X['Msg_Att_Scl'], X['Msg_Att_Mlt'])  # Message Attachments
-        scr_chr = AntiSpam.sigmoidy(msg_chr, X['Msg_Chr_Scl'], X['Msg_Chr_Mlt'])  # Special Characters
+        scr_len = profile.len_score(msg_len)  # Message Text Length
+        scr_men = profile.men_score(msg_men)  # Message User/Role Mentions
+        scr_att = profile.att_score(msg_att)  # Message Attachments
+        scr_chr = profile.chr_score(msg_chr)  # Special Characters
 
         raw_score = - sum((scr_len, scr_men, scr_att, scr_chr))
 
-        rep_mlt = AntiSpam.sigmoidy(abs(tracker.score), X['Rep_Grw_Scl'], X['Rep_Grw_Mlt']) + 1
+        rep_mlt = profile.rep_mlt(abs(await tracker.get_score()))
         score = rep_mlt * raw_score
 
-        tracker.score += score
+        new_score = await tracker.add_score(score)
 
-        return tracker.score, (
+        return new_score, (
             non_asciis, disc_objs, msg_len, msg_men, msg_att, msg_chr, scr_len, scr_men, scr_att, scr_chr, raw_score,
             rep_mlt, score)
 
@@ -242,42 +374,189 @@ class AntiSpam(Cog):
 
         await chl.send(embed=Embed.from_dict(embed_data))
 
-    async def _process_score(self, member: Member, *, data_log=None, msg: Message = None):
-        tracker = self._trackers[member]
-        score = tracker.score
-        if msg:
-            with protect(compact=True):
-                log_url = await self._detail_log(msg, data_log)
+    async def _dupe_log(self, msg: Message, cluster: DupeCluster):
+        chl_id = self.local_config['enabled_guilds'][msg.guild.id]['flagged_log_channel']
+        if not chl_id:
+            return
+        chl = self.bot.get_channel(chl_id)
+        if not chl:
+            raise ValueError(f'didnt find flag-log channel for antispam for guild {msg.guild.name} ({msg.guild.id})')
 
-            if score < self.local_config['flag_threshold']:
-                with protect(compact=True):
-                    await self._flagged_log(msg, log_url)
+        embed_data = {
+            "type"       : "rich",
+            "title"      : f"AntiSpam Flagged Near-Duplicate Messages from {len(cluster.author_ids)} Members",
+            "description": f"Latest: [this]({msg.jump_url}) in {msg.channel.mention} \n\n"
+                           f"Members: {' '.join(f'<@{i}>' for i in cluster.author_ids)} \n\n"
+                           f"Contents: \n{msg.content[:1000]}",
+            "color"      : 16711680
+        }
 
-                with suppress(Forbidden):
-                    await msg.channel.send(f'{member.mention} stop spam or mute.')
+        await chl.send(embed=Embed.from_dict(embed_data))
 
-        if score < self.local_config['mute_threshold']:
-            if not tracker.muted:
-                unmute_delay = tracker.time_until_score(self.local_config['unmute_reserve'])
+    async def _process_score(self, member: Member, *, data_log=None, msg: Message = None,
+                             received: float | None = None):
+        """Enforces (mutes/unmutes) based on the member's score right away,
+        then queues the logging and warnings for the given message, if any.
+
+        :param received: ``time.perf_counter()`` at message receipt, used to measure time-to-mute"""
+        tracker = self.tracker(member)
+        profile = self.profile(member.guild.id)
+        score = await tracker.get_score()
+
+        raid = self._raid(member.guild.id)
+        if score < profile.flag_threshold and self.local_config['raid']['enabled']:
+            if msg:
+                raid.channels.add(msg.channel.id)
+            if raid.note_flag(member.id, self.local_config['raid']['window']) >= self.local_config['raid']['flag_count']:
+                self._start_raid(member.guild)
+
+        muted = False
+        if score < profile.mute_threshold:
+            if raid.active:
+                # batched enforcement; no individual report either, the raid gets one consolidated report
+                if member.id not in raid.pending and not await tracker.is_muted():
+                    unmute_delay = await tracker.time_until_score(profile.unmute_reserve)
+                    raid.pending[member.id] = (member, max(unmute_delay, 60.))
+                return
+            if not await tracker.is_muted():
+                unmute_delay = await tracker.time_until_score(profile.unmute_reserve)
                 await tracker.mute(unmute_delay)
-                with suppress(Forbidden):
-                    msg and await msg.channel.send(f'{member.mention} get muted heheheha')
+                muted = True
+                if received is not None:
+                    self._action_times.append(elapsed := time.perf_counter() - received)
+                    log(f'Muted {member} {elapsed * 1000:.1f}ms after receiving their message', tag='AntiSpam')
 
-        elif score > self.local_config['unmute_reserve']:
-            if tracker.muted:
+        elif score > profile.unmute_reserve:
+            if await tracker.is_muted():
                 print(f'prematurely cancelling scheduled unmute task for {member} because apparently score went past unmute reserve')
                 await tracker.unmute()
 
-    def score_of(self, member: Member) -> float:
-        if member not in self._trackers:
-            self._trackers[member] = Tracker(member)
-        return self._trackers.get(member).score
+        if msg and not raid.active:
+            self._defer(self._report(member, msg, score, data_log, muted))
+
+    # ============= RAID MODE ============= #
+
+    def _raid(self, guild_id: int) -> RaidState:
+        if guild_id not in self._raids:
+            self._raids[guild_id] = RaidState()
+        return self._raids[guild_id]
+
+    def _start_raid(self, guild: Guild):
+        raid = self._raid(guild.id)
+        raid.active_until = time.time() + self.local_config['raid']['duration']  # (re-)extends an ongoing raid
+        if raid.runner is None:
+            raid.started = time.time()
+            log(f'Raid mode activated for guild {guild.name} ({guild.id})', tag='AntiSpam')
+            raid.runner = asyncio.create_task(self._run_raid(guild, raid))
+
+    async def _run_raid(self, guild: Guild, raid: RaidState):
+        conf = self.local_config['raid']
+        try:
+            with protect(compact=True, name='AntiSpam raid channel restrictions'):
+                await self._restrict_channels(guild, raid)
+            while raid.active or raid.pending:
+                await asyncio.sleep(conf['batch_interval'])
+                await self._enforce_pending(raid)
+                with protect(compact=True, name='AntiSpam raid channel restrictions'):
+                    await self._restrict_channels(guild, raid)  # the raid may have spread to new channels
+        finally:
+            with protect(compact=True, name='AntiSpam raid channel restoration'):
+                await self._restore_channels(guild, raid)
+            self._defer(self._raid_report(guild, time.time() - raid.started, list(raid.enforced),
+                                          list(raid.failed), len(raid.saved_channels)))
+            raid.reset()
+            log(f'Raid mode ended for guild {guild.name} ({guild.id})', tag='AntiSpam')
+
+    async def _enforce_pending(self, raid: RaidState):
+        """times out every pending member, a bounded number of requests at a time;
+        members that can't be timed out (e.g. no Moderate Members permission) get the mute role instead"""
+        if not raid.pending:
+            return
+        batch = list(raid.pending.values())
+        raid.pending.clear()
+        executor = BulkExecutor(self.local_config['raid']['concurrency'])
+        result = await executor.map(lambda item: self.tracker(item[0]).timeout(item[1]), batch)
+        not_timed_out = {i for i, _ in result.errors}
+        raid.enforced.extend(member for i, (member, _) in enumerate(batch) if i not in not_timed_out)
+        retry = [batch[i] for i in sorted(not_timed_out)]
+        if not retry:
+            return
 
-    def set_score(self, member: Member, value: float):
-        if member in self._trackers:
-            self._trackers[member].score = value
-        else:
-            self._trackers[member] = Tracker(member, value)
+        async def role_mute(item: tuple[Member, float]):
+            tracker = self.tracker(item[0])
+            if not await tracker.is_muted():
+                await tracker.mute(item[1])
+
+        fallback = await executor.map(role_mute, retry)
+        failed = {i for i, _ in fallback.errors}
+        for i, (member, _) in enumerate(retry):
+            (raid.failed if i in failed else raid.enforced).append(member)
+
+    async def _restrict_channels(self, guild: Guild, raid: RaidState):
+        conf = self.local_config['raid']
+        if not (conf['slowmode'] or conf['lockdown']):
+            return
+        for chl_id in raid.channels - raid.saved_channels.keys():
+            chl = guild.get_channel(chl_id)
+            if not isinstance(chl, TextChannel):
+                continue
+            raid.saved_channels[chl_id] = (chl.slowmode_delay, chl.overwrites_for(guild.default_role).send_messages)
+            if conf['slowmode']:
+                await chl.edit(slowmode_delay=max(chl.slowmode_delay, conf['slowmode']), reason='AntiSpam raid mode')
+            if conf['lockdown']:
+                await chl.set_permissions(guild.default_role, send_messages=False, reason='AntiSpam raid mode')
+
+    async def _restore_channels(self, guild: Guild, raid: RaidState):
+        conf = self.local_config['raid']
+        for chl_id, (slowmode, send_messages) in raid.saved_channels.items():
+            if not isinstance(chl := guild.get_channel(chl_id), TextChannel):
+                continue
+            with suppress(Forbidden, HTTPException):
+                if conf['slowmode']:
+                    await chl.edit(slowmode_delay=slowmode, reason='AntiSpam raid mode ended')
+                if conf['lockdown']:
+                    await chl.set_permissions(guild.default_role, send_messages=send_messages,
+                                              reason='AntiSpam raid mode ended')
+
+    async def _raid_report(self, guild: Guild, duration: float, enforced: list[Member], failed: list[Member],
+                           restricted: int):
+        chl_id = self.local_config['enabled_guilds'][guild.id]['flagged_log_channel']
+        if not chl_id or not (chl := self.bot.get_channel(chl_id)):
+            return
+
+        members = ' '.join(m.mention for m in enforced)
+        embed_data = {
+            "type"       : "rich",
+            "title"      : f"AntiSpam Raid Mode Report | `{len(enforced)}` Members Timed Out",
+            "description": f"Raid mode lasted `{duration:.0f}` seconds and restricted `{restricted}` channels. \n\n"
+                           f"Timed out: {members[:3000] or 'nobody'} \n\n"
+                           f"Failed to time out: {' '.join(m.mention for m in failed)[:500] or 'nobody'}",
+            "color"      : 16711680
+        }
+
+        await chl.send(embed=Embed.from_dict(embed_data))
+
+    async def _report(self, member: Member, msg: Message, score: float, data_log, muted: bool):
+        log_url = None
+        with protect(compact=True):
+            log_url = await self._detail_log(msg, data_log)
+
+        if score < self.profile(member.guild.id).flag_threshold:
+            with protect(compact=True):
+                await self._flagged_log(msg, log_url)
+
+            with suppress(Forbidden):
+                await msg.channel.send(f'{member.mention} stop spam or mute.')
+
+        if muted:
+            with suppress(Forbidden):
+                await msg.channel.send(f'{member.mention} get muted heheheha')
+
+    async def score_of(self, member: Member) -> float:
+        return await self.tracker(member).get_score()
+
+    async def set_score(self, member: Member, value: float):
+        await self.tracker(member).set_score(value)
 
     # ============= USER DISCORD COMMANDS ============= #
 
@@ -291,25 +570,63 @@ class AntiSpam(Cog):
     @_anti_spam.command(name='set_score', aliases=['setscore', 'set'])
     @guild_admin_or_perms(manage_roles=True)
     async def _set_score(self, ctx: Context, member: Member, value: float):
-        prev_score = self.score_of(member)
-        self.set_score(member, value)
+        prev_score = await self.score_of(member)
+        await self.set_score(member, value)
         await self._process_score(member)
         await ctx.send(f'Score of `{member.display_name}` has been changed from `{prev_score:.4}` to `{value}`')
 
     @_anti_spam.command(name='get_score', aliases=['getscore', 'get'])
     @guild_admin_or_perms(manage_roles=True)
     async def _get_score(self, ctx: Context, member: Member):
-        score = self.score_of(member)
+        score = await self.score_of(member)
         await ctx.send(f'Score of `{member.display_name}` is `{score:.4f}`')
 
+    @_anti_spam.command(name='tune', aliases=['profile'])
+    @guild_admin_or_perms(manage_roles=True)
+    async def _tune(self, ctx: Context, key: Optional[str] = None, value: Optional[float] = None):
+        """view or change this guild's scoring profile;
+        pass a key without a value to reset it to the global default"""
+        if ctx.guild.id not in self.enabled_guids:
+            await ctx.reply('AntiSpam is not enabled in this guild.', delete_after=5)
+            return
+        guild_conf = self.local_config['enabled_guilds'][ctx.guild.id]
+        if guild_conf is None:  # listed without any settings
+            guild_conf = self.local_config['enabled_guilds'][ctx.guild.id] = {}
+        overrides = guild_conf.setdefault('scoring', {})
+        if key is None:
+            profile = {**X, **{k: self.local_config[k] for k in THRESHOLDS}, **overrides}
+            await ctx.reply('\n'.join(f'`{k:<14}:` `{v}`{" (custom)" if k in overrides else ""}'
+                                      for k, v in profile.items()))
+            return
+        if key not in X and key not in THRESHOLDS:
+            await ctx.reply(f'Unknown key `{key}`. Valid keys: {", ".join(f"`{i}`" for i in (*X, *THRESHOLDS))}')
+            return
+
+        if value is None:
+            overrides.pop(key, None)
+        else:
+            overrides[key] = value
+        self.invalidate_profiles(ctx.guild.id)
+        self.save_local_config()
+        await ctx.reply(f'`{key}` is now `{overrides.get(key, X.get(key, self.local_config.get(key)))}` for this guild')
+
+    @_anti_spam.command(name='latency', aliases=['ttm'])
+    @guild_admin_or_perms(manage_roles=True)
+    async def _latency(self, ctx: Context):
+        """time-to-mute statistics (from message receipt to mute role applied)"""
+        if not self._action_times:
+            await ctx.reply('No mutes recorded yet.')
+            return
+        times = sorted(self._action_times)
+        pct = lambda p: times[min(int(p * len(times)), len(times) - 1)] * 1000
+        await ctx.reply(f'Time-to-mute over the last `{len(times)}` mutes: '
+                        f'p50 `{pct(0.5):.1f}ms`, p95 `{pct(0.95):.1f}ms`, max `{times[-1] * 1000:.1f}ms`')
+
     @_anti_spam.command(name='unmute')
     @guild_admin_or_perms(manage_roles=True)
     async def _unmute(self, ctx: Context, member: Member):
-        if member not in self._trackers:
-            self._trackers[member] = Tracker(member)
-
-        tracker = self._trackers.get(member)
-        if tracker.muted:
+        tracker = self.tracker(member)
+        if await tracker.is_muted():
             await tracker.unmute()
             await ctx.reply(f'Unmuted `{member.display_name}`')
         else:
@@ -319,10 +636,7 @@ class AntiSpam(Cog):
     @_anti_spam.command(name='mute')
     @guild_admin_or_perms(manage_roles=True)
     async def _mute(self, ctx: Context, member: Member, duration: int):
-        if member not in self._trackers:
-            self._trackers[member] = Tracker(member)
-
-        tracker = self._trackers.get(member)
+        tracker = self.tracker(member)
         await tracker.mute(duration)
         await ctx.reply('ok boomer muted.')
 
@@ -0,0 +1,328 @@
+"""
+Storage backends for AntiSpam state (reputation scores and mute deadlines).
+
+``MemoryBackend`` keeps everything inside the current process.
+``SocketBackend`` lets several bot processes on the same host share one view of the state:
+the first process to start hosts the state on a localhost socket and the others connect to it.
+All score updates are applied by the host one at a time, so they are atomic across processes.
+The host keeps a snapshot of the state on disk, so that whoever takes over hosting after it exits
+carries on from there instead of from empty state.
+"""
+
+import asyncio
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from contextlib import suppress
+
+from botcord.functions import log
+
+__all__ = ['StateBackend', 'MemoryBackend', 'SocketBackend', 'make_backend', 'decay']
+
+
+def decay(score: float, elapsed: float, rate: float) -> float:
+    """linearly decays a score towards 0 by ``rate`` points-per-second, without overshooting"""
+    offset = elapsed * rate
+    if offset >= abs(score):
+        return 0.0
+    return score - offset if score > 0 else score + offset
+
+
+class StateBackend(ABC):
+    """Interface for AntiSpam state storage.
+
+    Keys are strings identifying a member within a guild (see ``key()``).
+    Scores decay towards 0 over time at the ``rate`` given by the caller."""
+
+    @staticmethod
+    def key(guild_id: int, member_id: int) -> str:
+        return f'{guild_id}:{member_id}'
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def get_score(self, key: str, rate: float) -> float:
+        ...
+
+    @abstractmethod
+    async def add_score(self, key: str, delta: float, rate: float) -> float:
+        """atomically adds ``delta`` to the (decayed) score and returns the new score"""
+
+    @abstractmethod
+    async def set_score(self, key: str, value: float):
+        ...
+
+    @abstractmethod
+    async def get_mute_deadline(self, key: str) -> float | None:
+        """unix timestamp of when the member is due to be unmuted, or None if not muted"""
+
+    @abstractmethod
+    async def set_mute_deadline(self, key: str, deadline: float | None):
+        ...
+
+
+class MemoryBackend(StateBackend):
+    def __init__(self):
+        self._scores: dict[str, tuple[float, float]] = {}  # key: (score, last update time)
+        self._deadlines: dict[str, float] = {}
+
+    # the synchronous versions are used directly by the SocketBackend host
+    def get_score_now(self, key: str, rate: float) -> float:
+        score, last = self._scores.get(key, (0.0, time.time()))
+        now = time.time()
+        score = decay(score, now - last, rate)
+        self._scores[key] = (score, now)
+        return score
+
+    def add_score_now(self, key: str, delta: float, rate: float) -> float:
+        score = self.get_score_now(key, rate) + delta
+        self._scores[key] = (score, time.time())
+        return score
+
+    def set_score_now(self, key: str, value: float):
+        self._scores[key] = (value, time.time())
+
+    def get_mute_deadline_now(self, key: str) -> float | None:
+        deadline = self._deadlines.get(key)
+        if deadline is not None and deadline <= time.time():
+            del self._deadlines[key]
+            return None
+        return deadline
+
+    def set_mute_deadline_now(self, key: str, deadline: float | None):
+        if deadline is None:
+            self._deadlines.pop(key, None)
+        else:
+            self._deadlines[key] = deadline
+
+    def snapshot(self) -> dict:
+        return {'scores': self._scores, 'deadlines': self._deadlines}
+
+    def restore(self, snapshot: dict):
+        # scores keep their last update times, so they decay across the gap as if nothing happened
+        self._scores.update({key: tuple(value) for key, value in snapshot.get('scores', {}).items()})
+        self._deadlines.update(snapshot.get('deadlines', {}))
+
+    async def get_score(self, key: str, rate: float) -> float:
+        return self.get_score_now(key, rate)
+
+    async def add_score(self, key: str, delta: float, rate: float) -> float:
+        return self.add_score_now(key, delta, rate)
+
+    async def set_score(self, key: str, value: float):
+        self.set_score_now(key, value)
+
+    async def get_mute_deadline(self, key: str) -> float | None:
+        return self.get_mute_deadline_now(key)
+
+    async def set_mute_deadline(self, key: str, deadline: float | None):
+        self.set_mute_deadline_now(key, deadline)
+
+
+class SocketBackend(StateBackend):
+    """Shares state between processes over a localhost TCP socket,
+    using newline-delimited JSON requests.
+
+    Whichever process binds the port first hosts the state (in a ``MemoryBackend``);
+    the others act as clients. If the host goes away, the next request tries to take over hosting.
+
+    While hosting, the state is saved to ``snapshot_path`` every ``snapshot_interval`` seconds
+    (when it changed) and on close, and a new host starts from that snapshot.
+    Updates made after the last snapshot of a host that crashed are lost;
+    without a ``snapshot_path``, taking over starts from empty state (all scores 0, nobody muted)."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 47820, timeout: float = 2.,
+                 snapshot_path: str | None = None, snapshot_interval: float = 5.):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._dirty = False  # changed since the last snapshot
+        self._snapshot_task: asyncio.Task | None = None
+        self._store: MemoryBackend | None = None  # only set when this process is the host
+        self._server: asyncio.Server | None = None
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._clients: set[asyncio.StreamWriter] = set()  # connections to this process when hosting
+        self._lock = asyncio.Lock()  # one request in flight per client connection
+
+    @property
+    def is_host(self) -> bool:
+        return self._server is not None
+
+    async def start(self):
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            await self._start_hosting()
+            log(f'AntiSpam state backend hosting on {self.host}:{self.port}', tag='AntiSpam')
+        except OSError:  # port already taken; somebody else is hosting
+            await self._connect()
+            log(f'AntiSpam state backend connected to {self.host}:{self.port}', tag='AntiSpam')
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            with suppress(ConnectionError):
+                await self._writer.wait_closed()
+            self._reader = self._writer = None
+        if self._server is not None:
+            self._server.close()
+            for client in self._clients:
+                client.close()
+            await self._server.wait_closed()
+            if self._snapshot_task is not None:
+                self._snapshot_task.cancel()
+                self._snapshot_task = None
+            await self._save_snapshot()
+            self._server = self._store = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout)
+
+    # ========== Host side ========== #
+
+    async def _start_hosting(self):
+        """sets up the store for a process that just became the host, from the last host's snapshot if any"""
+        self._store = MemoryBackend()
+        snapshot = None
+        if self.snapshot_path is not None:
+            snapshot = await asyncio.to_thread(self._read_snapshot)
+        if snapshot is not None:
+            self._store.restore(snapshot)
+            log(f'AntiSpam state restored from {self.snapshot_path}', tag='AntiSpam')
+        if self.snapshot_path is not None:
+            self._snapshot_task = asyncio.create_task(self._snapshot_loop())
+
+    def _read_snapshot(self) -> dict | None:
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            log(f'Ignoring unreadable AntiSpam state snapshot {self.snapshot_path}', tag='Warn')
+            return None
+
+    def _write_snapshot(self, snapshot: dict):
+        with open(self.snapshot_path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(snapshot, file)
+        os.replace(self.snapshot_path + '.tmp', self.snapshot_path)
+
+    async def _save_snapshot(self):
+        if self.snapshot_path is None or self._store is None or not self._dirty:
+            return
+        self._dirty = False
+        snapshot = json.loads(json.dumps(self._store.snapshot()))  # a copy, taken before leaving the loop
+        try:
+            await asyncio.to_thread(self._write_snapshot, snapshot)
+        except OSError as e:
+            self._dirty = True
+            log(f'Could not save AntiSpam state snapshot: {e}', tag='Warn')
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            await self._save_snapshot()
+
+    def _apply(self, op: str, args: list):
+        store = self._store
+        match op:
+            case 'get_score':
+                return store.get_score_now(*args)
+            case 'add_score':
+                self._dirty = True
+                return store.add_score_now(*args)
+            case 'set_score':
+                self._dirty = True
+                return store.set_score_now(*args)
+            case 'get_mute_deadline':
+                return store.get_mute_deadline_now(*args)
+            case 'set_mute_deadline':
+                self._dirty = True
+                return store.set_mute_deadline_now(*args)
+        raise ValueError(f'Unknown AntiSpam backend operation {op}')
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._clients.add(writer)
+        with suppress(ConnectionError):
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    response = {'ok': True, 'result': self._apply(request['op'], request['args'])}
+                except Exception as e:
+                    response = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        self._clients.discard(writer)
+        writer.close()
+
+    # ========== Client side ========== #
+
+    async def _call(self, op: str, *args):
+        if self._store is not None:
+            return self._apply(op, list(args))
+
+        async with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._writer is None:
+                        await self._connect()
+                    self._writer.write(json.dumps({'op': op, 'args': args}).encode() + b'\n')
+                    await self._writer.drain()
+                    line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+                    if not line:
+                        raise ConnectionResetError('AntiSpam state host closed the connection')
+                    break
+                except (OSError, asyncio.TimeoutError):
+                    self._reader = self._writer = None
+                    if attempt:
+                        raise
+                    # the host might be gone; try to take its place before retrying
+                    with suppress(OSError):
+                        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+                        await self._start_hosting()
+                        log(f'AntiSpam state backend took over hosting on {self.host}:{self.port}',
+                            tag='AntiSpam')
+                        if self.snapshot_path is None:
+                            log('AntiSpam state was reset by the takeover (no snapshot_path configured): '
+                                'all scores are back to 0 and pending unmutes are forgotten', tag='Warn')
+                        return self._apply(op, list(args))
+
+        response = json.loads(line)
+        if not response['ok']:
+            raise RuntimeError(f'AntiSpam state host failed {op}: {response["error"]}')
+        return response['result']
+
+    async def get_score(self, key: str, rate: float) -> float:
+        return await self._call('get_score', key, rate)
+
+    async def add_score(self, key: str, delta: float, rate: float) -> float:
+        return await self._call('add_score', key, delta, rate)
+
+    async def set_score(self, key: str, value: float):
+        await self._call('set_score', key, value)
+
+    async def get_mute_deadline(self, key: str) -> float | None:
+        return await self._call('get_mute_deadline', key)
+
+    async def set_mute_deadline(self, key: str, deadline: float | None):
+        await self._call('set_mute_deadline', key, deadline)
+
+
+def make_backend(config: dict) -> StateBackend:
+    """creates a backend from the ``backend`` section of the AntiSpam config"""
+    match config.get('type', 'memory'):
+        case 'memory':
+            return MemoryBackend()
+        case 'socket':
+            return SocketBackend(config.get('host', '127.0.0.1'), config.get('port', 47820),
+                                 snapshot_path=config.get('snapshot'))
+        case other:
+            raise ValueError(f'Unknown AntiSpam state backend type: {other}')
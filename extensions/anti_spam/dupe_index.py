@@ -0,0 +1,145 @@
+"""
+Guild-wide near-duplicate message detection.
+
+Keeps MinHash signatures of recent messages in a fixed-size ring buffer,
+indexed by an LSH (banded) table, so that "the same text pasted by many accounts"
+can be spotted while keeping the cost of each lookup constant.
+"""
+
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from random import Random
+
+__all__ = ['DupeIndex', 'DupeCluster']
+
+_DISCORD_OBJ = re.compile(r'<(?:a?:\w+:|@!?|#|@&)\d+>')  # mentions, channels, custom emojis
+_WHITESPACE = re.compile(r'\s+')
+_MAX_CHARS = 1000  # only the start of long messages is shingled
+
+
+@dataclass(slots=True, eq=False)
+class _Entry:
+    seq: int
+    time: float
+    author_id: int
+    message_id: int
+    sig: tuple[int, ...]
+    keys: tuple[tuple, ...]
+    flagged: bool = False
+
+
+@dataclass(slots=True)
+class DupeCluster:
+    """A group of near-identical messages from enough distinct authors"""
+    author_ids: set[int]
+    message_ids: list[int]
+    new_author_ids: set[int] = field(default_factory=set)  # authors that were not part of an earlier report
+    is_new: bool = True  # whether no message in the cluster has been flagged before
+
+
+class DupeIndex:
+    """
+    Fixed-size LSH index of MinHash signatures.
+
+    Memory is bounded by ``capacity`` (entries) and ``bucket_size`` (entries per LSH bucket),
+    so a single ``add()`` touches at most ``bands * bucket_size`` candidates no matter how busy the guild is.
+    """
+
+    def __init__(self, *, capacity: int = 2048, bands: int = 8, rows: int = 2, bucket_size: int = 16,
+                 threshold: float = 0.6, window: float = 30., min_authors: int = 4, min_length: int = 12,
+                 seed: int = 0x0195):
+        self.capacity = capacity
+        self.bands = bands
+        self.rows = rows
+        self.bucket_size = bucket_size
+        self.threshold = threshold
+        self.window = window
+        self.min_authors = min_authors
+        self.min_length = min_length
+
+        rng = Random(seed)
+        self._masks: tuple[int, ...] = tuple(rng.getrandbits(64) for _ in range(bands * rows))
+        self._slots: list[_Entry | None] = [None] * capacity
+        self._seq = 0
+        self._buckets: dict[tuple, deque[_Entry]] = {}
+
+    @staticmethod
+    def normalize(content: str) -> str:
+        content = _DISCORD_OBJ.sub('', content.lower())
+        return _WHITESPACE.sub(' ', content).strip()[:_MAX_CHARS]
+
+    def signature(self, text: str) -> tuple[int, ...] | None:
+        """MinHash signature over character 3-grams; None if the text is too short to be meaningful"""
+        if len(text) < self.min_length:
+            return None
+        shingles = {hash(text[i:i + 3]) for i in range(len(text) - 2)}
+        return tuple(min(map(mask.__xor__, shingles)) for mask in self._masks)
+
+    def _band_keys(self, sig: tuple[int, ...]) -> tuple[tuple, ...]:
+        r = self.rows
+        return tuple((b, sig[b * r:(b + 1) * r]) for b in range(self.bands))
+
+    def similarity(self, a: tuple[int, ...], b: tuple[int, ...]) -> float:
+        """estimated Jaccard similarity of two signatures"""
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+    def _evict(self, old: _Entry):
+        for key in old.keys:
+            bucket = self._buckets.get(key)
+            # entries are appended in seq order, so the oldest one can only ever be at the left
+            if bucket and bucket[0] is old:
+                bucket.popleft()
+                if not bucket:
+                    del self._buckets[key]
+
+    def add(self, content: str, author_id: int, message_id: int, now: float | None = None) -> DupeCluster | None:
+        """Indexes a message and returns the cluster it completes/extends, if any"""
+        sig = self.signature(self.normalize(content))
+        if sig is None:
+            return None
+        now = time.time() if now is None else now
+
+        entry = _Entry(self._seq, now, author_id, message_id, sig, self._band_keys(sig))
+        self._seq += 1
+
+        # gather candidates before inserting (so the new entry doesn't match itself)
+        matches: dict[int, _Entry] = {}
+        for key in entry.keys:
+            for cand in self._buckets.get(key, ()):
+                if cand.seq in matches or now - cand.time > self.window:
+                    continue
+                if self._slots[cand.seq % self.capacity] is not cand:
+                    continue  # already overwritten in the ring buffer
+                if self.similarity(sig, cand.sig) >= self.threshold:
+                    matches[cand.seq] = cand
+
+        # insert into the ring buffer and buckets
+        slot = entry.seq % self.capacity
+        if (old := self._slots[slot]) is not None:
+            self._evict(old)
+        self._slots[slot] = entry
+        for key in entry.keys:
+            if (bucket := self._buckets.get(key)) is None:
+                bucket = self._buckets[key] = deque(maxlen=self.bucket_size)
+            bucket.append(entry)
+
+        members = [*matches.values(), entry]
+        author_ids = {e.author_id for e in members}
+        if len(author_ids) < self.min_authors:
+            return None
+
+        flagged_authors = {e.author_id for e in members if e.flagged}
+        cluster = DupeCluster(
+            author_ids=author_ids,
+            message_ids=[e.message_id for e in members],
+            new_author_ids=author_ids - flagged_authors,
+            is_new=not flagged_authors
+        )
+        for e in members:
+            e.flagged = True
+        return cluster
+
+    def __len__(self) -> int:
+        return min(self._seq, self.capacity)
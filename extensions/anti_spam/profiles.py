@@ -0,0 +1,87 @@
+"""
+Per-guild AntiSpam scoring profiles.
+
+A profile is the set of scoring constants and thresholds for one guild,
+"compiled" once into lookup tables (for the integer message features)
+and closures with the constants baked in, so that scoring a message does no config lookups.
+"""
+
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+
+__all__ = ['ScoringProfile', 'compile_profile', 'sigmoidy', 'paraboly']
+
+# how many values of each feature get precomputed; anything larger falls back to the baked function
+TABLE_SIZES = {'len': 4001, 'men': 101, 'att': 11, 'chr': 4001}
+
+
+def sigmoidy(x, in_max=1., out_max=1.) -> float:
+    return (1 / (1 + 15.7 ** (-3 * (x / in_max) + 1.5))) * out_max if x != 0 else 0
+
+
+def paraboly(x, in_max=1., out_max=1.) -> float:
+    return min((1.1 * (x / in_max) + 0.3) ** 2.1 - 0.04, (x / in_max) + 1) * out_max if x != 0 else 0
+
+
+def _bake(curve: Callable[[float, float, float], float], scl: float, mlt: float) -> Callable[[float], float]:
+    return lambda x: curve(x, scl, mlt)
+
+
+@dataclass(frozen=True, slots=True)
+class ScoringProfile:
+    flag_threshold: float
+    mute_threshold: float
+    unmute_reserve: float
+    rep_dec: float  # reputation decay rate (points-per-second)
+
+    len_table: tuple[float, ...]
+    men_table: tuple[float, ...]
+    att_table: tuple[float, ...]
+    chr_table: tuple[float, ...]
+    len_fn: Callable[[float], float]
+    men_fn: Callable[[float], float]
+    att_fn: Callable[[float], float]
+    chr_fn: Callable[[float], float]
+    rep_mlt: Callable[[float], float]  # abs(current score) -> score multiplier
+
+    def len_score(self, n: int) -> float:
+        return self.len_table[n] if n < len(self.len_table) else self.len_fn(n)
+
+    def men_score(self, n: int) -> float:
+        # n can be -1 after correcting for reply-mentions
+        return self.men_table[n] if 0 <= n < len(self.men_table) else self.men_fn(n)
+
+    def att_score(self, n: int) -> float:
+        return self.att_table[n] if n < len(self.att_table) else self.att_fn(n)
+
+    def chr_score(self, n: int) -> float:
+        return self.chr_table[n] if n < len(self.chr_table) else self.chr_fn(n)
+
+
+def compile_profile(constants: Mapping[str, float], thresholds: Mapping[str, float]) -> ScoringProfile:
+    """
+    Builds a profile from scoring constants (same keys as ``anti_spam.X``)
+    and thresholds (``flag_threshold``, ``mute_threshold``, ``unmute_reserve``)
+    """
+    c = constants
+    len_fn = _bake(sigmoidy, c['Msg_Len_Scl'], c['Msg_Len_Mlt'])
+    men_fn = _bake(paraboly, c['Msg_Men_Scl'], c['Msg_Men_Mlt'])
+    att_fn = _bake(sigmoidy, c['Msg_Att_Scl'], c['Msg_Att_Mlt'])
+    chr_fn = _bake(sigmoidy, c['Msg_Chr_Scl'], c['Msg_Chr_Mlt'])
+    rep_fn = _bake(sigmoidy, c['Rep_Grw_Scl'], c['Rep_Grw_Mlt'])
+
+    return ScoringProfile(
+        flag_threshold=thresholds['flag_threshold'],
+        mute_threshold=thresholds['mute_threshold'],
+        unmute_reserve=thresholds['unmute_reserve'],
+        rep_dec=c['Rep_Lin_Dec'],
+        len_table=tuple(map(len_fn, range(TABLE_SIZES['len']))),
+        men_table=tuple(map(men_fn, range(TABLE_SIZES['men']))),
+        att_table=tuple(map(att_fn, range(TABLE_SIZES['att']))),
+        chr_table=tuple(map(chr_fn, range(TABLE_SIZES['chr']))),
+        len_fn=len_fn,
+        men_fn=men_fn,
+        att_fn=att_fn,
+        chr_fn=chr_fn,
+        rep_mlt=lambda s: rep_fn(s) + 1
+    )
@@ -0,0 +1,48 @@
+"""
+Per-guild raid detection state for AntiSpam.
+
+A guild enters raid mode when enough distinct members get flagged within a short window.
+While in raid mode, enforcement is batched and reporting is consolidated (see ``AntiSpam``).
+"""
+
+import time
+from asyncio import Task
+from collections import deque
+from dataclasses import dataclass, field
+
+from discord import Member
+
+__all__ = ['RaidState']
+
+
+@dataclass(eq=False)
+class RaidState:
+    flags: deque[tuple[float, int]] = field(default_factory=deque)  # (time, member id) of recent flags
+    active_until: float = 0.
+    started: float = 0.
+    pending: dict[int, tuple[Member, float]] = field(default_factory=dict)  # member id: (member, timeout seconds)
+    enforced: list[Member] = field(default_factory=list)
+    failed: list[Member] = field(default_factory=list)
+    channels: set[int] = field(default_factory=set)  # channels the raid was seen in
+    saved_channels: dict[int, tuple[int, bool | None]] = field(default_factory=dict)  # id: (slowmode, send perms)
+    runner: Task | None = None
+
+    @property
+    def active(self) -> bool:
+        return time.time() < self.active_until
+
+    def note_flag(self, member_id: int, window: float, now: float | None = None) -> int:
+        """records a flagged member and returns the number of distinct members flagged within the window"""
+        now = time.time() if now is None else now
+        self.flags.append((now, member_id))
+        while self.flags and now - self.flags[0][0] > window:
+            self.flags.popleft()
+        return len({i for _, i in self.flags})
+
+    def reset(self):
+        self.pending.clear()
+        self.enforced.clear()
+        self.failed.clear()
+        self.channels.clear()
+        self.saved_channels.clear()
+        self.runner = None
@@ -1,13 +1,20 @@
 import re
-from asyncio import TimeoutError
-from datetime import datetime
-from typing import List, Optional, TYPE_CHECKING
+from asyncio import Lock, PriorityQueue, Task, TimeoutError, create_task, wait_for
+from collections.abc import Awaitable, Callable, Iterable
+from contextlib import suppress
+from datetime import timedelta
+from time import monotonic
+from typing import Optional, TYPE_CHECKING
 
-from discord import Message, Reaction, TextChannel, User
+from discord import (Forbidden, HTTPException, Message, NotFound, Object, RawBulkMessageDeleteEvent,
+                     RawMessageDeleteEvent, RawMessageUpdateEvent, Reaction, TextChannel, User)
 from discord.ext.commands import Context, check_any, command
+from discord.utils import snowflake_time, utcnow
 
 from botcord.ext.commands import Cog, guild_owner_or_perms, has_global_perms
 from botcord.functions import batch
+from botcord.utils import BulkExecutor
+from botcord.utils.errors import protect
 
 if TYPE_CHECKING:
     from botcord import BotClient
@@ -27,7 +34,25 @@ class LetterCounting(Cog):
             self.local_config['channels'] = list()
         if 'regex' not in self.local_config:
             self.local_config['regex'] = ''
-        self.delete_queue = []
+        # last accepted number and its message id for each channel, saved with the config so restarts resume from it
+        if 'state' not in self.local_config:
+            self.local_config['state'] = dict()
+        # [last verified message id, next expected number] for each channel, so error scans don't start from scratch
+        if 'checkpoints' not in self.local_config:
+            self.local_config['checkpoints'] = dict()
+        self._seed_locks: dict[int, Lock] = dict()
+        # each counting channel validates its messages one at a time, in snowflake order, through its own queue
+        self._queues: dict[int, PriorityQueue[tuple[int, Message]]] = dict()
+        self._validators: dict[int, Task] = dict()
+        self._caught_up: set[int] = set()  # channels whose saved state has been caught up since the cog loaded
+        self.save_interval: float = 60  # most seconds between config saves while counts and scans change it
+        self._last_save = monotonic()
+        self.delete_delay: float = 0.5  # how long to wait for more rejects before (bulk) deleting them
+        self._regex = re.compile(self.local_config['regex'])
+
+    def load_local_config(self):
+        super().load_local_config()
+        self._regex = re.compile(self.local_config.get('regex', ''))
 
     @staticmethod
     def _decompose(number):
@@ -51,25 +76,154 @@ class LetterCounting(Cog):
                 for i, letter in enumerate(reversed(letters.upper()))
         )
 
-    async def _errors_in(self, chl: TextChannel, *, limit: int = None, oldest_first: bool = True, **kwargs):
+    async def _errors_in(self, chl: TextChannel, *, limit: int = None, resume: bool = True,
+                         progress: Callable[[int], Awaitable] | None = None, progress_every: int = 1000):
+        """Yields messages that break the count, oldest first.
+
+        The scan resumes from the channel's checkpoint (unless ``resume`` is False),
+        and the checkpoint is moved forward for as long as no errors have been seen.
+
+        :param progress: awaited with the number of messages scanned so far, every ``progress_every`` messages"""
         if not isinstance(chl, TextChannel):
             raise TypeError(f'chl parameter must be a TextChannel, not {type(chl)}')
-        expected = 1
-        async for msg in chl.history(limit=limit, oldest_first=oldest_first, **kwargs):
+        checkpoints = self.local_config['checkpoints']
+        last_id, expected = checkpoints.get(chl.id, (None, 1)) if resume else (None, 1)
+
+        clean = True  # no errors so far; everything up to here is verified
+        scanned = 0
+        after = Object(last_id) if last_id else None
+        async for msg in chl.history(limit=limit, after=after, oldest_first=True):
             if not isinstance(msg, Message):
                 continue
-            content = re.sub(self.local_config['regex'], '', msg.content)
-            num = LetterCounting.base_alphabet_to_10(content)
+            scanned += 1
+            if progress is not None and scanned % progress_every == 0:
+                await progress(scanned)
+
+            num = LetterCounting.base_alphabet_to_10(self._regex.sub('', msg.content))
             if num == expected:
                 expected += 1
+                if clean:
+                    checkpoints[chl.id] = [msg.id, expected]
+                    self._save_throttled()
             else:
+                clean = False
                 yield msg
+        self._save_throttled(force=True)
+
+    def _invalidate_checkpoint(self, chl_id: int, msg_id: int):
+        """drops the checkpoint if an already-verified message changed"""
+        checkpoints = self.local_config['checkpoints']
+        if chl_id in checkpoints and msg_id <= checkpoints[chl_id][0]:
+            del checkpoints[chl_id]
+
+    @staticmethod
+    def _progress_editor(status: Message, template: str) -> Callable[..., Awaitable]:
+        """progress callback that edits ``status`` with ``template.format(*args)``, at most once every few seconds"""
+        last = monotonic()
+
+        async def progress(*args):
+            nonlocal last
+            if monotonic() - last >= 3:
+                last = monotonic()
+                await status.edit(content=template.format(*args))
+
+        return progress
+
+    async def _remove_errors_in(self, chl: TextChannel, errors: Iterable[Message | Object] | None = None, *,
+                                progress: Callable[[int, int], Awaitable] | None = None,
+                                concurrency: int = 3) -> int:
+        """Deletes the given (or all found) error messages by id, without re-reading the channel.
 
-    async def _remove_errors_in(self, chl: TextChannel, after_t: Optional[datetime] = None, errors: List[Message] = None):
+        Messages younger than 14 days go through bulk-delete in chunks of 100;
+        older ones can't, so they are deleted one by one with bounded concurrency.
+
+        :param progress: awaited with (deleted so far, total) as deletion goes on
+        :return: the number of messages deleted"""
         if not isinstance(chl, TextChannel):
             raise TypeError(f'chl parameter must be a TextChannel, not {type(chl)}')
-        errors = [i async for i in self._errors_in(chl, after=after_t)] if errors is None else errors
-        await chl.purge(check=lambda m: m in errors)
+        if errors is None:
+            errors = [i async for i in self._errors_in(chl)]
+        ids = {i.id for i in errors}
+        total = len(ids)
+
+        cutoff = utcnow() - timedelta(days=14) + timedelta(minutes=1)  # some leeway for clock drift
+        recent = sorted(i for i in ids if snowflake_time(i) > cutoff)
+        old = sorted(ids.difference(recent))
+
+        deleted = 0
+        for start in range(0, len(recent), 100):
+            chunk = recent[start:start + 100]
+            await chl.delete_messages([Object(i) for i in chunk])
+            deleted += len(chunk)
+            if progress is not None:
+                await progress(deleted, total)
+
+        async def delete_old(msg_id: int):
+            with suppress(NotFound):  # already gone is just as good
+                await chl.get_partial_message(msg_id).delete()
+
+        async def old_progress(done: int, _):
+            await progress(deleted + done, total)
+
+        result = await BulkExecutor(concurrency).map(delete_old, old,
+                                                     progress=old_progress if progress is not None else None)
+        result.raise_first()
+        return deleted + len(result.ok)
+
+    @staticmethod
+    def _number_of(msg: Message) -> int:
+        return LetterCounting.base_alphabet_to_10(msg.content.strip().strip('|'))
+
+    async def _last_accepted(self, chl: TextChannel, *, before: Message | None = None) -> list[int]:
+        """(number, message id) of the last accepted count in the channel.
+
+        Only touches history the first time a channel is seen (or after its last count was deleted);
+        a saved state is caught up with whatever was posted while the bot was offline."""
+        state = self.local_config['state']
+        if chl.id in state:
+            return state[chl.id]
+
+        if chl.id not in self._seed_locks:
+            self._seed_locks[chl.id] = Lock()
+        async with self._seed_locks[chl.id]:
+            if chl.id not in state:  # another message might have seeded it while we waited
+                state[chl.id] = await self._seed(chl, before)
+        return state[chl.id]
+
+    async def _seed(self, chl: TextChannel, before: Message | None) -> list[int]:
+        prev = None
+        async for msg in chl.history(before=before, limit=100):
+            if msg.author.id != self.bot.user.id:
+                prev = msg
+                break
+        return [self._number_of(prev), prev.id] if prev else [0, 0]
+
+    async def _catch_up(self, chl: TextChannel, *, before: Message):
+        """advances a saved state over counts that were posted while the bot was offline, up to ``before``"""
+        num, msg_id = self.local_config['state'][chl.id]
+        async for msg in chl.history(after=Object(msg_id), before=before, limit=None, oldest_first=True):
+            if msg.author.id != self.bot.user.id and self._number_of(msg) == num + 1:
+                num, msg_id = num + 1, msg.id
+        self.local_config['state'][chl.id] = [num, msg_id]
+
+    def _save_throttled(self, *, force: bool = False):
+        """saves the config if the last save was ``save_interval`` or more ago (or ``force``),
+        so a crash loses at most that much of the state and checkpoints; lost counts are caught up on restart"""
+        if force or monotonic() - self._last_save >= self.save_interval:
+            self._last_save = monotonic()
+            with protect(OSError, compact=True, name='LetterCounting config save'):
+                self.save_local_config()
+
+    async def cog_unload(self):
+        for task in self._validators.values():
+            task.cancel()
+        await super().cog_unload()
+
+    async def __init_async__(self):
+        state = self.local_config['state']
+        for chl_id in list(state):
+            if chl_id not in self.local_config['channels']:
+                del state[chl_id]
 
     @Cog.listener()
     async def on_message(self, message: Message):
@@ -78,32 +232,93 @@ class LetterCounting(Cog):
         if message.author.id == self.bot.user.id:
             return
 
-        prev = None
-        async for msg in message.channel.history(before=message.created_at, limit=100):
-            if msg.id not in self.delete_queue:
-                prev = msg
-                break
-        new_num = LetterCounting.base_alphabet_to_10(message.content.strip().strip('|'))
-        prev_num = LetterCounting.base_alphabet_to_10(prev.content.strip().strip('|')) if prev else 0
-        if new_num - 1 != prev_num:
-            self.delete_queue.append(message.id)
-            await message.delete()
-            self.delete_queue.remove(message.id)
+        chl_id = message.channel.id
+        if chl_id not in self._queues:
+            self._queues[chl_id] = PriorityQueue()
+        self._queues[chl_id].put_nowait((message.id, message))
+        if chl_id not in self._validators or self._validators[chl_id].done():
+            self._validators[chl_id] = create_task(self._validate(message.channel, self._queues[chl_id]))
+
+    async def _validate(self, chl: TextChannel, queue: PriorityQueue[tuple[int, Message]]):
+        """single consumer of a channel's queue;
+        checks each message against the expected number and deletes rejects in batches"""
+        rejects: list[Message] = []
+        first_reject = 0.  # when the oldest pending reject came in
+        while True:
+            # while there are rejects waiting, wait for more only until the oldest has waited `delete_delay`,
+            # so that a steady stream of messages can't hold them back
+            remaining = self.delete_delay - (monotonic() - first_reject)
+            if rejects and remaining <= 0:
+                await self._delete_rejects(chl, rejects)
+                rejects = []
+            try:
+                _, message = await (wait_for(queue.get(), remaining) if rejects else queue.get())
+            except TimeoutError:
+                await self._delete_rejects(chl, rejects)
+                rejects = []
+                continue
+
+            with protect(name='LetterCounting validation'):  # keep the consumer alive through API hiccups
+                if chl.id not in self._caught_up:
+                    # once per channel, by its only consumer, so nothing else writes its state meanwhile
+                    self._caught_up.add(chl.id)
+                    if chl.id in self.local_config['state']:
+                        await self._catch_up(chl, before=message)
+                prev_num, _ = await self._last_accepted(chl, before=message)
+                if self._number_of(message) - 1 != prev_num:
+                    if not rejects:
+                        first_reject = monotonic()
+                    rejects.append(message)
+                    if len(rejects) >= 100:  # bulk delete limit
+                        await self._delete_rejects(chl, rejects)
+                        rejects = []
+                else:
+                    self.local_config['state'][chl.id] = [prev_num + 1, message.id]
+                    self._save_throttled()
+
+    @staticmethod
+    async def _delete_rejects(chl: TextChannel, rejects: list[Message]):
+        with protect(Forbidden, NotFound, HTTPException, compact=True, name='LetterCounting reject deletion'):
+            await chl.delete_messages(rejects)  # one bulk-delete request (or a normal delete for just one)
+
+    @Cog.listener()
+    async def on_raw_message_delete(self, payload: RawMessageDeleteEvent):
+        state = self.local_config['state']
+        if payload.channel_id in state and state[payload.channel_id][1] == payload.message_id:
+            # the last accepted count is gone; find the new last one from history next time
+            del state[payload.channel_id]
+        self._invalidate_checkpoint(payload.channel_id, payload.message_id)
+
+    @Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: RawBulkMessageDeleteEvent):
+        state = self.local_config['state']
+        if payload.channel_id in state and state[payload.channel_id][1] in payload.message_ids:
+            del state[payload.channel_id]
+        if payload.message_ids:
+            self._invalidate_checkpoint(payload.channel_id, min(payload.message_ids))
+
+    @Cog.listener()
+    async def on_raw_message_edit(self, payload: RawMessageUpdateEvent):
+        if 'content' in payload.data:  # ignore embed-only updates
+            self._invalidate_checkpoint(payload.channel_id, payload.message_id)
 
     @command()
     @check_any(guild_owner_or_perms(administrator=True), has_global_perms(owner=True))
-    async def find_errors(self, ctx: Context, chl: Optional[TextChannel] = None):
+    async def find_errors(self, ctx: Context, chl: Optional[TextChannel] = None, full: bool = False):
+        """lists messages that break the count; pass `full` to ignore the saved checkpoint and rescan everything"""
         channel = chl if chl is not None else ctx.channel
         await ctx.message.delete()
+        status = await ctx.send('Scanning...')
         count = 0
         msg = ''
-        async for err in self._errors_in(channel):
+        async for err in self._errors_in(channel, resume=not full, progress=self._progress_editor(status, 'Scanning... ({} messages checked)')):
             msg += f'{getattr(err, "jump_url", "")}\n'
             count += 1
             if count > 50:
                 await ctx.send('More than 50 errors found... showing oldest 50.')
                 break
 
+        await status.delete()
         if msg.strip('\n'):
             msg = '**__Errors:__** \n' + msg
             for i in batch(msg):
@@ -113,10 +328,13 @@ class LetterCounting(Cog):
 
     @command()
     @check_any(guild_owner_or_perms(administrator=True), has_global_perms(owner=True))
-    async def remove_errors(self, ctx: Context, chl: Optional[TextChannel] = None):
+    async def remove_errors(self, ctx: Context, chl: Optional[TextChannel] = None, full: bool = False):
         if chl is None:
             return
-        errors = [i async for i in self._errors_in(chl)]
+        status = await ctx.reply('Scanning...')
+        scan_progress = self._progress_editor(status, 'Scanning... ({} messages checked)')
+        errors = [i async for i in self._errors_in(chl, resume=not full, progress=scan_progress)]
+        await status.delete()
         if not errors:
             await ctx.reply(f'No errors found in {chl.mention}.', delete_after=5)
             return
@@ -138,8 +356,9 @@ class LetterCounting(Cog):
             await ctx.send('Canceled.', delete_after=3)
         else:
             msg = await ctx.reply('Deleting...')
-            await self._remove_errors_in(chl, errors=errors)
-            await msg.edit(content='Operation Completed.')
+            deleted = await self._remove_errors_in(chl, errors,
+                                                   progress=self._progress_editor(msg, 'Deleting... ({}/{})'))
+            await msg.edit(content=f'Operation Completed. ({deleted} messages deleted)')
 
 
 async def setup(bot: 'BotClient'):
@@ -1,15 +1,20 @@
 import asyncio
-from collections.abc import Callable
-from contextlib import suppress
-from typing import Sequence, TYPE_CHECKING
-
-from discord import AllowedMentions, Forbidden, ForumChannel, Guild, HTTPException, Member, NotFound, StageChannel, \
-    TextChannel, Thread, User, VoiceChannel, Webhook
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager, suppress
+from tempfile import SpooledTemporaryFile
+from typing import IO, Sequence, TYPE_CHECKING
+
+from discord import AllowedMentions, Attachment, File, Forbidden, ForumChannel, Guild, HTTPException, Member, \
+    NotFound, StageChannel, TextChannel, Thread, User, VoiceChannel, Webhook
+from discord.abc import GuildChannel
 from discord.ext.commands import command
 from discord.utils import MISSING
 
 from botcord.ext.commands import Cog, Context
 from botcord.types import WebhookMessagableChannel, WebhookPossessingChannel
+from botcord.utils import BulkExecutor, ByteSemaphore, protect
+from botcord.utils.concurrency import is_transient
+from .pool import PooledHook, WebhookPool
 
 if TYPE_CHECKING:
     from botcord import BotClient
@@ -20,6 +25,42 @@ class MessageHook(Cog):
     def __init__(self, bot: 'BotClient'):
         self.bot = bot
         self.mentions = AllowedMentions(everyone=False, users=True, roles=False)
+        self.init_local_config(__file__)
+        default_relay = {'spool_threshold': 8 * 1024 ** 2, 'max_inflight': 100 * 1024 ** 2, 'chunk_size': 64 * 1024}
+        default_relay.update(self.local_config.get('relay', {}))
+        self.local_config['relay'] = default_relay
+        self._inflight = ByteSemaphore(default_relay['max_inflight'])  # attachment bytes being relayed right now
+        default_pool = {'size': 3, 'rate': 5, 'per': 2, 'max_failures': 3}
+        default_pool.update(self.local_config.get('pool', {}))
+        self.local_config['pool'] = default_pool
+        self._pools: dict[int, WebhookPool] = {}  # channel id: webhooks to send with, filled lazily
+        self._pool_locks: dict[int, asyncio.Lock] = {}  # so concurrent sends don't fetch/create hooks twice
+        self._own_updates: dict[int, int] = {}  # channel id: webhook updates caused by our own creates/deletes
+
+    @Cog.listener()
+    async def on_webhooks_update(self, channel: GuildChannel):
+        if self._own_updates.get(channel.id):  # the pool already knows about this one
+            self._own_updates[channel.id] -= 1
+            return
+        if (pool := self._pools.get(channel.id)) is not None:
+            pool.stale = True
+
+    async def _delete_retired(self, channel_id: int, pooled: PooledHook):
+        """deletes a webhook that kept failing, so that it doesn't take up one of the channel's webhook slots"""
+        with protect(compact=True, name='MessageHook retired webhook deletion'):
+            async with self._expect_update(channel_id):
+                await pooled.hook.delete(reason='MessageHook: webhook kept failing')
+
+    @asynccontextmanager
+    async def _expect_update(self, channel_id: int) -> AsyncIterator[None]:
+        """marks the webhooks update event caused by the webhook change in the block as our own"""
+        # counted up front, since the gateway event may arrive before the HTTP response does
+        self._own_updates[channel_id] = self._own_updates.get(channel_id, 0) + 1
+        try:
+            yield
+        except BaseException:
+            self._own_updates[channel_id] -= 1
+            raise
 
     @command(name='send', aliases=['say'])
     async def _send_cmd(self, ctx: Context, *, text: str | None = None, delete: bool = True):
@@ -29,15 +70,14 @@ class MessageHook(Cog):
             await ctx.reply('Messages must be 2000 or fewer characters in length. (nitro abuse smh)', delete_after=5)
             return
 
-        attachments = await asyncio.gather(*(item.to_file() for item in ctx.message.attachments))
-
-        delete_task = asyncio.create_task(ctx.message.delete()) if delete else None
+        async with self._relayed(ctx.message.attachments) as attachments:
+            delete_task = asyncio.create_task(ctx.message.delete()) if delete else None
 
-        with suppress(Forbidden):
-            await ctx.send(content=text,
-                           files=attachments,
-                           reference=ctx.message.reference,  # type: ignore # what
-                           allowed_mentions=self.mentions)
+            with suppress(Forbidden):
+                await ctx.send(content=text,
+                               files=attachments,
+                               reference=ctx.message.reference,  # type: ignore # what
+                               allowed_mentions=self.mentions)
         if delete_task is not None:
             with suppress(Forbidden, NotFound):
                 await delete_task
@@ -57,19 +97,18 @@ class MessageHook(Cog):
             await ctx.reply('Messages must be 2000 or fewer characters in length. (nitro abuse smh)', delete_after=5)
             return
 
-        attachments = await asyncio.gather(*(item.to_file() for item in ctx.message.attachments))
-
-        delete_task = asyncio.create_task(ctx.message.delete()) if delete else None
-
-        try:
-            await MessageHook.send(ctx.channel, text, user.name, user.display_avatar.url, attachments, self.mentions)
-        except Forbidden:
-            with suppress(Forbidden):
-                await ctx.reply('Missing Permissions', delete_after=5)
-        except HTTPException as error:
-            if error.code == 30007:
-                await ctx.reply('All existing webhooks are unusable (please delete). '
-                                'Failed to create new one: Maximum number of webhooks in this channel reached (10).')
+        async with self._relayed(ctx.message.attachments) as attachments:
+            delete_task = asyncio.create_task(ctx.message.delete()) if delete else None
+
+            try:
+                await self.send(ctx.channel, text, user.name, user.display_avatar.url, attachments, self.mentions)
+            except Forbidden:
+                with suppress(Forbidden):
+                    await ctx.reply('Missing Permissions', delete_after=5)
+            except HTTPException as error:
+                if error.code == 30007:
+                    await ctx.reply('All existing webhooks are unusable (please delete). Failed to create new one: '
+                                    'Maximum number of webhooks in this channel reached (10).')
         if delete_task is not None:
             with suppress(Forbidden, NotFound):
                 await delete_task
@@ -81,24 +120,85 @@ class MessageHook(Cog):
         try:
             check = lambda hook: hook.name == 'MessageHook' or hook.user == ctx.bot.user
             deleted = await MessageHook.clean_hooks(ctx.guild, check)
+            for chl in ctx.guild.channels:
+                self._pools.pop(chl.id, None)
             await ctx.reply(f'Deleted {deleted} webhooks.')
         except Forbidden:
             with suppress(Forbidden):
                 await ctx.reply('Missing Permissions', delete_after=5)
 
+    async def _download(self, attachment: Attachment, fp: IO[bytes]):
+        async with self.bot.web_client.get(attachment.url) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.content.iter_chunked(self.local_config['relay']['chunk_size']):
+                fp.write(chunk)
+        fp.seek(0)
+
+    @asynccontextmanager
+    async def _relayed(self, attachments: Sequence[Attachment]) -> AsyncIterator[list[File]]:
+        """
+        Streams attachments from the CDN into files ready to be re-uploaded.
+        Small files stay in memory; anything over ``spool_threshold`` bytes is spooled to a temporary file.
+        Their total size counts against the bot-wide ``max_inflight`` cap until the block exits.
+        """
+        if not attachments:
+            yield []
+            return
+
+        conf = self.local_config['relay']
+        async with self._inflight.hold(sum(item.size for item in attachments)):
+            buffers = [SpooledTemporaryFile(max_size=conf['spool_threshold']) for _ in attachments]
+            try:
+                await asyncio.gather(*(self._download(item, fp) for item, fp in zip(attachments, buffers)))
+                yield [File(fp, filename=item.filename, spoiler=item.is_spoiler(), description=item.description)
+                       for item, fp in zip(attachments, buffers)]
+            finally:
+                for fp in buffers:
+                    fp.close()
+
     @staticmethod
     async def clean_hooks(guild: Guild, check: Callable[[Webhook], bool]) -> int:
-        """Deletes all webhooks in a guild that match the given check function."""
+        """Deletes all webhooks in a guild that match the given check function.
+        Returns how many were deleted; raises the first error only if none could be."""
         hooks = await guild.webhooks()
         hooks_to_delete = list(filter(check, hooks))
         if not hooks_to_delete:
             return 0
 
-        await asyncio.gather(*(hook.delete() for hook in hooks_to_delete))
-        return len(hooks_to_delete)
-
-    @staticmethod
-    async def send(chl: WebhookMessagableChannel,
+        result = await BulkExecutor(concurrency=3).map(lambda hook: hook.delete(), hooks_to_delete)
+        if not result.ok:
+            result.raise_first()
+        return len(result.ok)
+
+    async def _get_hook(self, parent_channel: WebhookPossessingChannel) -> tuple[WebhookPool, PooledHook]:
+        """picks the webhook with the most remaining budget, growing the pool when they're all used up"""
+        pool = self._pools.get(parent_channel.id)
+        if pool is not None and not pool.stale and (pooled := pool.pick()) is not None:
+            if pool.full or pool.budget(pooled):
+                return pool, pooled
+
+        if parent_channel.id not in self._pool_locks:
+            self._pool_locks[parent_channel.id] = asyncio.Lock()
+        async with self._pool_locks[parent_channel.id]:
+            if (pool := self._pools.get(parent_channel.id)) is None:
+                pool = self._pools[parent_channel.id] = WebhookPool(**self.local_config['pool'])
+            if pool.stale:
+                pool.sync(await parent_channel.webhooks())
+
+            pooled = pool.pick()
+            if pooled is None or not (pool.full or pool.budget(pooled)):
+                try:
+                    async with self._expect_update(parent_channel.id):
+                        hook = await parent_channel.create_webhook(name='MessageHook', reason='MessageHook')
+                    pooled = pool.add(hook)
+                except HTTPException as error:
+                    if pooled is None or error.code != 30007:
+                        raise
+                    pool.size = len(pool.hooks)  # the channel is out of webhook slots; make do with what we have
+            return pool, pooled
+
+    async def send(self,
+                   chl: WebhookMessagableChannel,
                    content: str | None,
                    username: str,
                    avatar_url: str,
@@ -109,21 +209,34 @@ class MessageHook(Cog):
         if parent_channel is None:
             raise ValueError('Cannot find valid channel from chl.')
 
-        hooks = await parent_channel.webhooks()
-        valid_hook = None
-        for hook in hooks:
-            if hook.token:
-                valid_hook = hook
-                break
-        if not valid_hook:
-            valid_hook = await parent_channel.create_webhook(name='MessageHook', reason='MessageHook')
-
-        await valid_hook.send(content=content or MISSING,
-                              username=username,
-                              avatar_url=avatar_url,
-                              files=attachments or MISSING,
-                              thread=chl if isinstance(chl, Thread) else MISSING,
-                              allowed_mentions=allowed_mentions)
+        for attempt in range(2):
+            pool, pooled = await self._get_hook(parent_channel)
+            pool.note_send(pooled)
+            try:
+                await pooled.hook.send(content=content or MISSING,
+                                       username=username,
+                                       avatar_url=avatar_url,
+                                       files=attachments or MISSING,
+                                       thread=chl if isinstance(chl, Thread) else MISSING,
+                                       allowed_mentions=allowed_mentions)
+                pool.succeeded(pooled)
+                return
+            except Forbidden:
+                raise  # our permissions, not the webhook's fault
+            except HTTPException as error:
+                # the webhook was deleted (NotFound / Unknown Webhook); drop it and try another one once
+                if isinstance(error, NotFound) or error.code == 10015:
+                    pool.retire(pooled)
+                    if attempt:
+                        raise
+                else:
+                    # only rate limits and server errors say something about the webhook;
+                    # the rest (bad payload, too large, ...) would fail on any webhook
+                    if is_transient(error) and pool.failed(pooled):
+                        self.bot.task_keeper.run_coro(self._delete_retired(parent_channel.id, pooled))
+                    raise
+                for file in attachments or ():
+                    file.reset()  # files were (partially) read by the failed attempt
 
 
 async def setup(bot: 'BotClient'):
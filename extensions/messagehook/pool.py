@@ -0,0 +1,92 @@
+"""
+Per-channel webhook pools for MessageHook.
+
+Discord rate-limits each webhook separately, so spreading sends over a few webhooks
+lets a busy channel go faster than one webhook allows.
+discord.py doesn't expose the rate-limit headers of webhook sends,
+so each webhook's remaining budget is estimated locally from its recent sends.
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from discord import Webhook
+
+__all__ = ['PooledHook', 'WebhookPool']
+
+
+@dataclass(eq=False)
+class PooledHook:
+    hook: Webhook
+    sends: deque[float] = field(default_factory=deque)  # monotonic times of recent sends
+    failures: int = 0  # consecutive
+
+    def budget(self, rate: int, per: float, now: float | None = None) -> int:
+        """estimated number of sends left before this webhook gets rate limited"""
+        now = time.monotonic() if now is None else now
+        while self.sends and now - self.sends[0] >= per:
+            self.sends.popleft()
+        return max(0, rate - len(self.sends))
+
+
+class WebhookPool:
+    """The webhooks MessageHook uses in one channel"""
+
+    def __init__(self, size: int = 3, rate: int = 5, per: float = 2., max_failures: int = 3):
+        self.size = min(size, 9)  # Discord allows 10 webhooks per channel; leave room for everyone else
+        self.rate = rate
+        self.per = per
+        self.max_failures = max_failures
+        self.hooks: list[PooledHook] = []
+        # id: monotonic time until which a webhook that kept failing stays out of the pool;
+        # retired webhooks are normally deleted, this only matters when deleting them failed
+        self.retired: dict[int, float] = {}
+        self.stale = True  # whether the channel's webhooks need to be fetched (again)
+
+    @property
+    def full(self) -> bool:
+        return len(self.hooks) >= self.size
+
+    def pick(self) -> PooledHook | None:
+        """the webhook with the most remaining budget, or None if the pool is empty"""
+        if not self.hooks:
+            return None
+        now = time.monotonic()
+        return max(self.hooks, key=lambda p: p.budget(self.rate, self.per, now))
+
+    def budget(self, pooled: PooledHook) -> int:
+        return pooled.budget(self.rate, self.per)
+
+    def sync(self, hooks: list[Webhook]):
+        """updates the pool from the channel's current webhooks, keeping the send history of known ones"""
+        now = time.monotonic()
+        self.retired = {hook_id: until for hook_id, until in self.retired.items() if until > now}
+        known = {p.hook.id: p for p in self.hooks}
+        self.hooks = [known.get(hook.id) or PooledHook(hook) for hook in hooks
+                      if hook.token and hook.id not in self.retired][:self.size]
+        self.stale = False
+
+    def add(self, hook: Webhook) -> PooledHook:
+        pooled = PooledHook(hook)
+        self.hooks.append(pooled)
+        return pooled
+
+    def note_send(self, pooled: PooledHook):
+        pooled.sends.append(time.monotonic())
+
+    def succeeded(self, pooled: PooledHook):
+        pooled.failures = 0
+
+    def failed(self, pooled: PooledHook) -> bool:
+        """counts a failure and retires the webhook once it fails too many times in a row; returns whether it was"""
+        pooled.failures += 1
+        if pooled.failures >= self.max_failures:
+            self.retire(pooled)
+            return True
+        return False
+
+    def retire(self, pooled: PooledHook, cooldown: float = 600.):
+        self.retired[pooled.hook.id] = time.monotonic() + cooldown
+        if pooled in self.hooks:
+            self.hooks.remove(pooled)
@@ -1,12 +1,12 @@
-from asyncio import gather
 from contextlib import suppress
 from typing import TYPE_CHECKING
 
-from discord import Message, User
+from discord import User
 from discord.ext.commands import Context, check_any, command
 
 from botcord.ext.commands import Cog
 from botcord.ext.commands.checks import guild_owner_or_perms, has_global_perms
+from botcord.utils import BulkExecutor
 
 if TYPE_CHECKING:
     from botcord import BotClient
@@ -39,30 +39,19 @@ class Purger(Cog):
             await ctx.send('Who on Mars are you trying to obliterate here? Yourself? '
                            'This command only works in guilds.')
             return
-        channels = ctx.guild.text_channels
-        tasks = []
-        for channel in channels:
-            tasks.append(channel.purge(check=lambda m: m.author == user))
-
-        res: list[list[Message] | BaseException] = await gather(*tasks, return_exceptions=True)
-
-        deleted = 0
-        errors = []
-        for r in res:
-            if isinstance(r, BaseException):
-                if isinstance(r, Exception):
-                    errors.append(r)
-                else:
-                    raise r
-            else:
-                deleted += len(r)
-
-        if errors:
+        # a few channels at a time; purging every channel at once trips the global rate limit
+        res = await BulkExecutor(concurrency=3).map(
+                lambda channel: channel.purge(check=lambda m: m.author == user),
+                ctx.guild.text_channels,
+                route=lambda channel: channel.id
+        )
+        deleted = sum(map(len, res.ok))
+
+        if res.errors:
             await ctx.send('Error(s) have occurred while obliterating messages... '
                            'Not all messages may have been deleted.')
         await ctx.send(f'Obliteration complete. ({deleted} messages vaporized)', delete_after=5)
-        if errors:
-            raise errors[0]
+        res.raise_first()
 
 
 async def setup(bot: 'BotClient'):
@@ -1,9 +1,12 @@
+from collections import Counter
+from time import monotonic
 from typing import TYPE_CHECKING
 
 from discord.ext.commands import Cog, Context, command
 
 from botcord.functions import batch
-from .socialscan.util import execute_queries
+from botcord.utils.errors import protect
+from .socialscan.util import Scanner
 
 if TYPE_CHECKING:
     from botcord import BotClient
@@ -12,6 +15,28 @@ if TYPE_CHECKING:
 class NerdUtils(Cog):
     def __init__(self, bot: 'BotClient'):
         self.bot = bot
+        self.scanner: Scanner | None = None  # needs the bot's http client, which exists only once the loop runs
+
+    async def __init_async__(self):
+        # kept for the bot's lifetime so platform tokens and recent results are reused between commands
+        self.scanner = Scanner(self.bot.web_client)
+
+    @staticmethod
+    def _scan_status(header: str, timings: dict[str, list[float]], totals: dict[str, int],
+                     lines: list[str]) -> tuple[str, int]:
+        """status message: header, per-platform progress and timing, then as many result lines as fit;
+        also returns how many of the lines fit"""
+        msg = header + '\n'
+        for platform, total in totals.items():
+            took = timings.get(platform, [])
+            msg += f'`{platform}` {len(took)}/{total}' + (f', slowest {max(took):.1f}s' if took else '') + '\n'
+        msg += '\n'
+        for n, line in enumerate(lines):
+            if len(msg) + len(line) + 40 > 2000:
+                msg += f'...and {len(lines) - n} more'
+                return msg, n
+            msg += line + '\n'
+        return msg, len(lines)
 
     @command()
     async def socialscan(self, ctx: Context, *, usernames=None):
@@ -19,14 +44,38 @@ class NerdUtils(Cog):
             return
         usernames = usernames.split(",")
         usernames = [i.strip() for i in usernames]
-        await ctx.reply(f'Scanning for {usernames}...')
-        results = await execute_queries(usernames, aiohttp_session=self.bot.aiohttp_session)
-        msg = ''
-        for result in results:
-            msg += f'`{result.query}` on **`{result.platform}`**: [Success: `{result.success}`, Valid: `{result.valid}`, **Available: `{result.available}`**] (`{result.message if result.message else "No response"}`)\n'
-        for i in batch(msg):
-            await ctx.reply(i)
-        await ctx.reply('Finished Scan.')
+        if self.scanner is None:
+            self.scanner = Scanner(self.bot.web_client)
+        pairs = self.scanner.pairs(usernames)
+        totals = Counter(str(platform) for _, platform in pairs)
+        header = f'Scanning for {usernames}...'
+        status = await ctx.reply(header)
+
+        start = last_edit = monotonic()
+        timings: dict[str, list[float]] = {}
+        lines, results = [], []
+        async for result, took in self.scanner.stream(pairs):
+            results.append(result)
+            timings.setdefault(str(result.platform), []).append(took)
+            mark = '✅' if result.available else '❌' if result.success else '⚠️'
+            line = f'{mark} `{result.query}` on **`{result.platform}`** ({took:.1f}s)'
+            lines.append(line if result.success else f'{line}: `{result.message or "No response"}`')
+            if monotonic() - last_edit >= 2:
+                last_edit = monotonic()
+                with protect():
+                    content, _ = self._scan_status(f'{header} {len(results)}/{len(pairs)} done', timings, totals, lines)
+                    await status.edit(content=content)
+
+        available = sum(result.available for result in results)
+        failed = sum(not result.success for result in results)
+        summary = (f'Scanned {len(usernames)} name(s) on {len(totals)} platform(s) in {monotonic() - start:.1f}s: '
+                   f'**{available} available**, {len(results) - available - failed} taken, {failed} failed.')
+        content, shown = self._scan_status(summary, timings, totals, lines)
+        with protect():
+            await status.edit(content=content)
+        if shown < len(lines):  # only what didn't fit in the status
+            for chunk in batch('\n'.join(lines[shown:])):
+                await ctx.reply(chunk)
 
 
 async def setup(bot: 'BotClient'):
@@ -1,2 +1,2 @@
 __version__ = "1.4.2"
-from .util import execute_queries, sync_execute_queries
+from .util import Scanner, execute_queries, sync_execute_queries
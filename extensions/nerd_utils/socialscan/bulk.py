@@ -0,0 +1,215 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Bulk scanning of large lists of usernames/emails into a JSONL file.
+
+Queries are read lazily and only `window` of them are in progress at a time, so memory use
+doesn't depend on the size of the input. Each finished query is appended to the output as one
+JSON row per platform, in input order, and a checkpoint next to the output records how far the
+scan got, so an interrupted scan picks up where it left off when run again. The checkpoint also
+identifies the input it belongs to, and a scan of some other input into the same output is refused.
+
+    python -m extensions.nerd_utils.socialscan.bulk usernames.txt results.jsonl
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+
+import aiohttp
+
+from .platforms import Platforms
+from .util import Scanner
+
+CHECKPOINT_INTERVAL = 1  # seconds between checkpoint writes
+FINGERPRINT_QUERIES = 1000  # leading queries that identify an input in the checkpoint
+
+
+def read_queries(source):
+    """Yields the non-empty, stripped queries from a file path (one per line) or an iterable of strings"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding="utf-8") as file:
+            yield from read_queries(file)
+        return
+    for line in source:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def response_row(response):
+    row = dataclasses.asdict(response)
+    row["platform"] = str(response.platform)
+    return row
+
+
+def fingerprint(queries):
+    """Identifies an input by its first `FINGERPRINT_QUERIES` queries
+
+    Returns:
+        (fingerprint `str`, iterator over all of `queries`, including the ones read for the fingerprint)
+    """
+    queries = iter(queries)
+    head = list(itertools.islice(queries, FINGERPRINT_QUERIES))
+    digest = hashlib.sha256("\n".join(head).encode()).hexdigest()
+    return digest, itertools.chain(head, queries)
+
+
+def load_checkpoint(path):
+    """(queries done, output size, input fingerprint) saved at `path`, or None if there is no checkpoint"""
+    try:
+        with open(path, encoding="utf-8") as file:
+            saved = json.load(file)
+        return saved["done"], saved["offset"], saved["source"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+
+def save_checkpoint(path, done, offset, source):
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump({"done": done, "offset": offset, "source": source}, file)
+    os.replace(path + ".tmp", path)
+
+
+class _Pending:
+    __slots__ = ("query", "remaining", "rows")
+
+    def __init__(self, query_, remaining):
+        self.query = query_
+        self.remaining = remaining
+        self.rows = []
+
+
+async def bulk_scan(
+    queries,
+    output,
+    platforms=None,
+    proxy_list=None,
+    aiohttp_session=None,
+    concurrency=4,
+    window=100,
+    checkpoint=None,
+):
+    """Scan every query on the specified platforms, appending the results to `output` as JSON lines.
+
+    Args:
+        queries (`str` or iterable of `str`): Path of a file with one query per line, or the queries themselves.
+        output (`str`): Path of the JSONL file to append to. When resuming an interrupted run of the same input,
+            rows written after its last checkpoint are dropped, since those queries get scanned again.
+        platforms (`list` of `Platforms` members, optional): List of platforms to execute queries for. Defaults to all platforms.
+        proxy_list (`list` of `str`, optional): List of HTTP proxies to rotate through.
+        aiohttp_session (aiohttp 'ClientSession'): an aiohttp ClientSession to make requests with if provided, otherwise creates new one.
+        concurrency (`int`): Max number of requests in flight per platform.
+        window (`int`): Max number of queries in progress (or finished but waiting for an earlier query) at a time.
+        checkpoint (`str`, optional): Path of the checkpoint file. Defaults to `output` + ".checkpoint".
+
+    Returns:
+        `int` number of queries scanned by this run (not counting ones skipped from the checkpoint).
+
+    Raises:
+        ValueError: if the checkpoint is for a different input, or the output no longer has the rows it records.
+    """
+    if platforms is None:
+        platforms = list(Platforms)
+    if checkpoint is None:
+        checkpoint = output + ".checkpoint"
+
+    source_id, source = fingerprint(read_queries(queries))
+    saved = load_checkpoint(checkpoint)
+    if saved is None:
+        done, offset = 0, None
+    else:
+        done, offset, saved_id = saved
+        if saved_id != source_id:
+            raise ValueError(
+                f"{checkpoint} is for a different input; use another output, or delete it to start over"
+            )
+        if offset > (os.path.getsize(output) if os.path.exists(output) else 0):
+            raise ValueError(f"{output} is shorter than {checkpoint} records; delete the checkpoint to start over")
+    source = itertools.islice(source, done, None)
+
+    close = False
+    if aiohttp_session is None:
+        aiohttp_session = aiohttp.ClientSession()
+        close = True
+    # results are only reused within a query, not across a whole scan, to keep memory flat
+    scanner = Scanner(aiohttp_session, proxy_list=proxy_list, concurrency=concurrency, cache_size=0)
+    pending = deque()  # queries in input order, so rows are written (and checkpointed) in order
+    tasks = set()
+    scanned = 0
+    last_save = time.monotonic()
+
+    async def run(entry, platform):
+        return entry, await scanner.query(entry.query, platform)
+
+    try:
+        with open(output, "a+b") as out:
+            if offset is not None:
+                # anything past the checkpoint belongs to queries that will be scanned again
+                out.truncate(offset)
+            while True:
+                while len(pending) < window:
+                    query_ = next(source, None)
+                    if query_ is None:
+                        break
+                    pairs = scanner.pairs([query_], platforms)
+                    entry = _Pending(query_, len(pairs))
+                    pending.append(entry)
+                    tasks.update(asyncio.ensure_future(run(entry, p)) for _, p in pairs)
+                if not pending:
+                    break
+
+                if tasks:
+                    finished, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in finished:
+                        entry, response = task.result()
+                        entry.remaining -= 1
+                        if response is not None:
+                            entry.rows.append(response_row(response))
+
+                while pending and pending[0].remaining == 0:
+                    entry = pending.popleft()
+                    out.write("".join(json.dumps(row) + "\n" for row in entry.rows).encode())
+                    done += 1
+                    scanned += 1
+                if time.monotonic() - last_save >= CHECKPOINT_INTERVAL:
+                    out.flush()
+                    save_checkpoint(checkpoint, done, out.tell(), source_id)
+                    last_save = time.monotonic()
+            out.flush()
+            save_checkpoint(checkpoint, done, out.tell(), source_id)
+    finally:
+        for task in tasks:
+            task.cancel()
+        if close:
+            await aiohttp_session.close()
+    return scanned
+
+
+def sync_bulk_scan(queries, output, platforms=None, proxy_list=None, **kwargs):
+    """Synchronous wrapper around `bulk_scan`"""
+    return asyncio.run(bulk_scan(queries, output, platforms, proxy_list, **kwargs))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scan a list of usernames/emails into a JSONL file.")
+    parser.add_argument("input", help="file with one username or email per line")
+    parser.add_argument("output", help="JSONL file to append results to")
+    parser.add_argument("--platforms", nargs="*", help="platform names (default: all)")
+    parser.add_argument("--proxies", help="file with one HTTP proxy per line")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight per platform")
+    args = parser.parse_args()
+
+    selected = [Platforms[name.upper()] for name in args.platforms] if args.platforms else None
+    proxies = list(read_queries(args.proxies)) if args.proxies else None
+    count = sync_bulk_scan(args.input, args.output, selected, proxies, concurrency=args.concurrency)
+    print(f"Scanned {count} queries into {args.output}", file=sys.stderr)
@@ -2,8 +2,10 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import asyncio
 import re
 import logging
+import time
 from dataclasses import dataclass
 from enum import Enum
 from typing import Optional
@@ -11,6 +13,7 @@ from typing import Optional
 import aiohttp
 
 from . import __version__
+from .proxies import ProxyPool
 
 
 class QueryError(Exception):
@@ -27,6 +30,7 @@ class PlatformChecker:
     TOKEN_ERROR_MESSAGE = "Could not retrieve token. You might be sending too many requests. Use a proxy or wait before trying again."
     TOO_MANY_REQUEST_ERROR_MESSAGE = "Requests denied by platform due to excessive requests. Use a proxy or wait before trying again."
     TIMEOUT_DURATION = 15
+    TOKEN_TTL = 600  # seconds a prerequest token is reused for before fetching a new one
 
     client_timeout = aiohttp.ClientTimeout(connect=TIMEOUT_DURATION)
 
@@ -39,22 +43,27 @@ class PlatformChecker:
         """
         Retrieve and return platform token using the `prerequest` method specified in the class
 
-        Normal calls will not be able to take advantage of this as all tokens are retrieved concurrently
-        This only applies to when tokens are retrieved before main queries with -c
-        Adds 1-2s to overall running time but halves HTTP requests sent for bulk queries
+        The token is shared by concurrent queries (only one prerequest is sent at a time)
+        and reused until it is older than `TOKEN_TTL` or `invalidate_token()` is called
         """
-        if self.prerequest_sent:
-            if self.token is None:
-                raise QueryError(PlatformChecker.TOKEN_ERROR_MESSAGE)
-            return self.token
-        else:
+        async with self._token_lock:
+            if self.prerequest_sent and time.monotonic() - self.token_time < self.TOKEN_TTL:
+                if self.token is None:
+                    raise QueryError(PlatformChecker.TOKEN_ERROR_MESSAGE)
+                return self.token
             self.token = await self.prerequest()
             self.prerequest_sent = True
+            self.token_time = time.monotonic()
             if self.token is None:
                 raise QueryError(PlatformChecker.TOKEN_ERROR_MESSAGE)
             logging.debug(f"TOKEN {Platforms(self.__class__)}: {self.token}")
             return self.token
 
+    def invalidate_token(self):
+        """Make the next `get_token()` send a fresh prerequest (e.g. after the token stopped working)"""
+        self.prerequest_sent = False
+        self.token = None
+
     def response_failure(self, query, *, message="Failure"):
         return PlatformResponse(
             platform=Platforms(self.__class__),
@@ -106,15 +115,16 @@ class PlatformChecker:
             return self.response_invalid(query, message=message)
 
     def _request(self, method, url, **kwargs):
-        proxy = (
-            self.proxy_list[self.request_count % len(self.proxy_list)] if self.proxy_list else None
-        )
         self.request_count += 1
         if "headers" in kwargs:
             kwargs["headers"].update(PlatformChecker.DEFAULT_HEADERS)
         else:
             kwargs["headers"] = PlatformChecker.DEFAULT_HEADERS
-        return self.session.request(method, url, timeout=self.client_timeout, proxy=proxy, **kwargs)
+        if self.proxy_pool:
+            return self.proxy_pool.request(
+                self.session, str(Platforms(self.__class__)), method, url, timeout=self.client_timeout, **kwargs
+            )
+        return self.session.request(method, url, timeout=self.client_timeout, **kwargs)
 
     def post(self, url, **kwargs):
         logging.debug(f"POST {url}")
@@ -143,12 +153,17 @@ class PlatformChecker:
         logging.debug(f"TEXT {request.url} {request.status}: {text}")
         return text
 
-    def __init__(self, session, proxy_list=[]):
+    def __init__(self, session, proxy_list=[], proxy_pool=None):
         self.session = session
         self.proxy_list = proxy_list
+        if proxy_pool is None and proxy_list:
+            proxy_pool = ProxyPool(proxy_list)
+        self.proxy_pool = proxy_pool
         self.request_count = 0
         self.prerequest_sent = False
         self.token = None
+        self.token_time = 0.0
+        self._token_lock = asyncio.Lock()
 
 
 class Snapchat(PlatformChecker):
@@ -0,0 +1,196 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Health-scored proxy selection for platform checkers.
+
+Each (proxy, platform) pair keeps a success rate, a latency average and a count of 429s.
+Requests go to a random proxy weighted towards fast, reliable ones; a proxy that gets throttled
+or fails several times in a row is left alone for a while (longer each time it happens again),
+and no proxy carries more than `max_in_flight` requests at once.
+"""
+
+import asyncio
+import random
+import time
+
+import aiohttp
+
+try:
+    from botcord.http import CircuitOpenError
+
+    # raised by the bot's WebClient before anything is sent, so they say nothing about the proxy
+    NOT_SENT_ERRORS = (CircuitOpenError,)
+except ImportError:  # used with a plain aiohttp session, outside the bot
+    NOT_SENT_ERRORS = ()
+
+LATENCY_SMOOTHING = 0.3  # weight of the newest sample in the latency average
+FAILURE_STREAK = 3  # consecutive failures before a cooldown
+
+
+class ProxyHealth:
+    """Health of one proxy for one platform"""
+
+    __slots__ = ("successes", "failures", "throttled", "latency", "streak", "strikes", "cooldown_until")
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.throttled = 0  # 429 responses
+        self.latency = None  # seconds, moving average
+        self.streak = 0  # consecutive failures
+        self.strikes = 0  # cooldowns so far without a success in between
+        self.cooldown_until = 0.0
+
+    @property
+    def success_rate(self):
+        # smoothed so that untried proxies start at 0.5 rather than at either extreme
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def weight(self):
+        return self.success_rate / max(self.latency if self.latency is not None else 1.0, 0.05)
+
+
+class ProxyPool:
+    """Picks proxies for requests by health, per platform.
+
+    Args:
+        proxies (`list` of `str`): HTTP proxies to use.
+        max_in_flight (`int`): Max number of concurrent requests through one proxy.
+        cooldown (`float`): Seconds a proxy is skipped after its first throttle or failure streak; doubles each time after.
+        max_cooldown (`float`): Longest cooldown.
+    """
+
+    def __init__(self, proxies, max_in_flight=8, cooldown=30.0, max_cooldown=600.0):
+        self.proxies = list(dict.fromkeys(proxies))
+        self.max_in_flight = max_in_flight
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.in_flight = dict.fromkeys(self.proxies, 0)
+        self._health = {}  # (proxy, platform name): ProxyHealth
+        self._freed = asyncio.Condition()
+
+    def __len__(self):
+        return len(self.proxies)
+
+    def health(self, proxy, platform):
+        key = (proxy, platform)
+        if key not in self._health:
+            self._health[key] = ProxyHealth()
+        return self._health[key]
+
+    def pick(self, platform, now=None):
+        """A proxy that is free and not cooling down for `platform`, chosen by weight; None if there is none"""
+        now = time.monotonic() if now is None else now
+        candidates, weights = [], []
+        for proxy in self.proxies:
+            health = self.health(proxy, platform)
+            if self.in_flight[proxy] < self.max_in_flight and health.cooldown_until <= now:
+                candidates.append(proxy)
+                weights.append(health.weight())
+        if not candidates:
+            return None
+        return random.choices(candidates, weights)[0]
+
+    async def acquire(self, platform):
+        """Waits for a usable proxy for `platform` and reserves a slot on it"""
+        async with self._freed:
+            while (proxy := self.pick(platform)) is None:
+                now = time.monotonic()
+                cooling = [
+                    h.cooldown_until for (p, name), h in self._health.items()
+                    if name == platform and h.cooldown_until > now and self.in_flight[p] < self.max_in_flight
+                ]
+                timeout = min(cooling) - now if cooling else None
+                try:
+                    await asyncio.wait_for(self._freed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            self.in_flight[proxy] += 1
+            return proxy
+
+    def record(self, proxy, platform, *, status=None, latency=None, error=False):
+        """Records how a request through `proxy` went: its response status, or `error` if it got no response"""
+        health = self.health(proxy, platform)
+        if latency is not None:
+            health.latency = (
+                latency if health.latency is None
+                else LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * health.latency
+            )
+        if status == 429:
+            health.throttled += 1
+            health.failures += 1
+            self._cool_down(health)
+        elif error or (status is not None and status >= 500):
+            health.failures += 1
+            health.streak += 1
+            if health.streak >= FAILURE_STREAK:
+                self._cool_down(health)
+        else:
+            health.successes += 1
+            health.streak = health.strikes = 0
+
+    async def release(self, proxy):
+        """Frees the slot taken by `acquire`"""
+        self.in_flight[proxy] -= 1
+        async with self._freed:
+            self._freed.notify_all()
+
+    def _cool_down(self, health):
+        health.cooldown_until = time.monotonic() + min(self.cooldown * 2 ** health.strikes, self.max_cooldown)
+        health.strikes += 1
+        health.streak = 0
+
+    def request(self, session, platform, method, url, **kwargs):
+        """`session.request(...)` through a proxy from the pool, as an async context manager"""
+        return _ProxiedRequest(self, session, platform, method, url, kwargs)
+
+    def stats(self):
+        """{proxy: {platform: summary}} of everything tried so far"""
+        result = {}
+        for (proxy, platform), health in self._health.items():
+            result.setdefault(proxy, {})[platform] = {
+                "success_rate": round(health.success_rate, 3),
+                "latency": health.latency,
+                "throttled": health.throttled,
+                "cooling_down": health.cooldown_until > time.monotonic(),
+            }
+        return result
+
+
+class _ProxiedRequest:
+    # the proxy's slot is held until the response is released, its health is recorded as soon as headers arrive
+    def __init__(self, pool, session, platform, method, url, kwargs):
+        self.pool = pool
+        self.session = session
+        self.platform = platform
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+        self.proxy = None
+        self.request = None
+
+    async def __aenter__(self):
+        self.proxy = await self.pool.acquire(self.platform)
+        start = time.monotonic()
+        self.request = self.session.request(self.method, self.url, proxy=self.proxy, **self.kwargs)
+        try:
+            response = await self.request.__aenter__()
+        except NOT_SENT_ERRORS:
+            await self.pool.release(self.proxy)
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.pool.record(self.proxy, self.platform, latency=time.monotonic() - start, error=True)
+            await self.pool.release(self.proxy)
+            raise
+        except BaseException:  # cancelled; says nothing about the proxy
+            await self.pool.release(self.proxy)
+            raise
+        self.pool.record(self.proxy, self.platform, status=response.status, latency=time.monotonic() - start)
+        return response
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            return await self.request.__aexit__(exc_type, exc, tb)
+        finally:
+            await self.pool.release(self.proxy)
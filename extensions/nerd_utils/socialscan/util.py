@@ -5,10 +5,13 @@
 import asyncio
 import re
 import sys
+import time
+from collections import OrderedDict
 
 import aiohttp
 
-from .platforms import PlatformResponse, Platforms, QueryError
+from .platforms import PlatformChecker, PlatformResponse, Platforms, QueryError
+from .proxies import ProxyPool
 
 EMAIL_REGEX = re.compile(
     r"^[a-zA-Z0-9.!#$%&’*+/=?^_`{|}~-]+@[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,253}[a-zA-Z0-9])?(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,253}[a-zA-Z0-9])?)+$"
@@ -25,37 +28,149 @@ def init_checkers(session, platforms=None, proxy_list=None):
         proxy_list = []
     if platforms is None:
         platforms = list(Platforms)
+    # one pool for all platforms, so a proxy's concurrency cap holds across them
+    proxy_pool = ProxyPool(proxy_list) if proxy_list else None
     checkers = {}
     for platform in platforms:
-        checkers[platform] = platform.value(session, proxy_list=proxy_list)
+        checkers[platform] = platform.value(session, proxy_list=proxy_list, proxy_pool=proxy_pool)
     return checkers
 
 
+def supports(query_, platform):
+    """Whether `platform` can check `query_` (emails and usernames are checked by different platforms)"""
+    if EMAIL_REGEX.match(query_):
+        return hasattr(platform.value, "check_email")
+    return hasattr(platform.value, "check_username")
+
+
+async def _query(query_, platform, checkers):
+    is_email = EMAIL_REGEX.match(query_)
+    if is_email and hasattr(platform.value, "check_email"):
+        response = await checkers[platform].check_email(query_)
+        if response is None:
+            raise QueryError("Error retrieving result")
+        return response
+    elif not is_email and hasattr(platform.value, "check_username"):
+        response = await checkers[platform].check_username(query_)
+        if response is None:
+            raise QueryError("Error retrieving result")
+        return response
+
+
+def _token_rejected(result):
+    """Whether an exception raised by (or a response returned from) a checker means its token was refused"""
+    if isinstance(result, aiohttp.ClientResponseError):
+        return result.status in (401, 403)
+    if isinstance(result, QueryError):
+        return str(result) == PlatformChecker.TOKEN_ERROR_MESSAGE
+    if isinstance(result, PlatformResponse):
+        return not result.success and result.message == PlatformChecker.TOKEN_ERROR_MESSAGE
+    return False
+
+
 async def query(query_, platform, checkers):
-    try:
-        is_email = EMAIL_REGEX.match(query_)
-        if is_email and hasattr(platform.value, "check_email"):
-            response = await checkers[platform].check_email(query_)
-            if response is None:
-                raise QueryError("Error retrieving result")
+    retry = hasattr(platform.value, "prerequest")
+    while True:
+        try:
+            response = await _query(query_, platform, checkers)
+        except (aiohttp.ClientError, KeyError, QueryError) as e:
+            response, error = None, e
+        else:
+            error = None
+        # the token may have expired or been revoked; get a new one and try once more.
+        # anything else (timeouts, throttling, bad responses) wouldn't be helped by a new token
+        if retry and _token_rejected(error if error is not None else response):
+            retry = False
+            checkers[platform].invalidate_token()
+            continue
+        if error is None:
             return response
-        elif not is_email and hasattr(platform.value, "check_username"):
-            response = await checkers[platform].check_username(query_)
-            if response is None:
-                raise QueryError("Error retrieving result")
-            return response
-    except (aiohttp.ClientError, KeyError, QueryError) as e:
         return PlatformResponse(
             platform=platform,
             query=query_,
             available=False,
             valid=False,
             success=False,
-            message=f"{type(e).__name__} - {e}",
+            message=f"{type(error).__name__} - {error}",
             link=None,
         )
 
 
+class Scanner:
+    """Long-lived set of platform checkers, meant to be kept around and reused for many scans.
+
+    Tokens are kept by the checkers between scans (see `PlatformChecker.get_token`),
+    queries to each platform run under a concurrency cap,
+    and successful results are reused for a short while.
+
+    Args:
+        session (aiohttp 'ClientSession'): the session to make requests with.
+        proxy_list (`list` of `str`, optional): List of HTTP proxies to execute queries with.
+        concurrency (`int`): Max number of queries in flight per platform.
+        cache_ttl (`float`): Seconds a successful (query, platform) result is reused for.
+        cache_size (`int`): Max number of results kept.
+    """
+
+    def __init__(self, session, proxy_list=None, concurrency=4, cache_ttl=300, cache_size=2048):
+        self.checkers = init_checkers(session, proxy_list=proxy_list)
+        self.limits = {platform: asyncio.Semaphore(concurrency) for platform in Platforms}
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # (query, platform): (time, PlatformResponse)
+
+    def cached(self, query_, platform):
+        entry = self._cache.get((query_, platform))
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.cache_ttl:
+            del self._cache[(query_, platform)]
+            return None
+        return entry[1]
+
+    async def query(self, query_, platform):
+        """Result of one query on one platform (None if the platform doesn't support that kind of query)"""
+        if (response := self.cached(query_, platform)) is not None:
+            return response
+        async with self.limits[platform]:
+            response = await query(query_, platform, self.checkers)
+        if response is not None and response.success:
+            self._cache[(query_, platform)] = (time.monotonic(), response)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return response
+
+    def pairs(self, queries, platforms=None):
+        """(query, platform) pairs to check, leaving out the ones a platform doesn't support"""
+        if platforms is None:
+            platforms = list(Platforms)
+        return [(q, p) for q in queries for p in platforms if supports(q, p)]
+
+    async def _timed_query(self, query_, platform):
+        start = time.monotonic()
+        response = await self.query(query_, platform)
+        return response, time.monotonic() - start
+
+    async def stream(self, pairs):
+        """Yields `(PlatformResponse, seconds taken)` for each of `pairs` as soon as it completes
+
+        Queries still running when the generator is closed are cancelled.
+        """
+        tasks = [asyncio.ensure_future(self._timed_query(q, p)) for q, p in pairs]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def execute(self, queries, platforms=None):
+        """Same as `execute_queries`, with the scanner's checkers, limits and cache"""
+        if platforms is None:
+            platforms = list(Platforms)
+        results = await asyncio.gather(*(self.query(q, p) for q in queries for p in platforms))
+        return [x for x in results if x is not None]
+
+
 async def execute_queries(queries, platforms=None, proxy_list=None, aiohttp_session=None):
     """Execute each of the queries on the specified platforms concurrently and return a list of results.
 
@@ -0,0 +1,202 @@
+"""
+Exact solver for "make the target from these numbers with + - * /" puzzles, like the 24 game.
+
+Works on sub-multisets of the numbers with exact ``Fraction`` values:
+``reachable()`` memoizes every value each sub-multiset can make,
+and solutions are only built for the (sub-multiset, value) pairs that lead to the target.
+
+Expressions are kept in a canonical form, so that ones that only differ by commutativity or associativity
+(``1 + 2`` and ``2 + 1``, ``(a - b) - c`` and ``a - (b + c)``, ``a / (b / c)`` and ``a * c / b``)
+count as one solution. Sums and products are flattened into sorted lists of added/subtracted
+(multiplied/divided) operands, which are never sums (products) themselves.
+
+Run this module directly for a benchmark against the previous, enumerate-everything solver.
+"""
+
+from collections.abc import Iterable
+from fractions import Fraction
+from functools import lru_cache
+from itertools import combinations
+
+__all__ = ['Expr', 'reachable', 'has_solution', 'solve']
+
+Numbers = tuple[Fraction, ...]  # a sorted multiset
+
+
+class Expr:
+    """
+    An expression in canonical form.
+
+    ``op`` is ``'+'`` (``pos`` are added, ``neg`` subtracted), ``'*'`` (``pos`` multiplied, ``neg`` divided by)
+    or ``''`` for a single number. ``text`` is the rendered expression and doubles as the canonical key.
+    """
+    __slots__ = ('op', 'pos', 'neg', 'value', 'text')
+
+    def __init__(self, op: str, pos: tuple['Expr', ...], neg: tuple['Expr', ...], value: Fraction, text: str = ''):
+        self.op = op
+        self.pos = pos
+        self.neg = neg
+        self.value = value
+        self.text = text or self._render()
+
+    @classmethod
+    def number(cls, value: Fraction) -> 'Expr':
+        return cls('', (), (), value, str(value) if value.denominator == 1 else f'({value})')
+
+    def _render(self) -> str:
+        if self.op == '+':
+            return ' - '.join([' + '.join(e.text for e in self.pos), *(e.text for e in self.neg)])
+        # sums are the only operands of a product that need parentheses
+        parts = [f'({e.text})' if e.op == '+' else e.text for e in self.pos + self.neg]
+        return ' / '.join([' * '.join(parts[:len(self.pos)]), *parts[len(self.pos):]])
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f'Expr({self.text!r} = {self.value})'
+
+
+def _combine(op: str, a: Expr, b: Expr, invert: bool, value: Fraction) -> Expr:
+    """``a + b``/``a * b``, or with ``invert``, ``a - b``/``a / b``; flattened and sorted"""
+    a_pos, a_neg = (a.pos, a.neg) if a.op == op else ((a,), ())
+    b_pos, b_neg = (b.pos, b.neg) if b.op == op else ((b,), ())
+    if invert:
+        b_pos, b_neg = b_neg, b_pos
+    by_text = lambda e: e.text
+    return Expr(op, tuple(sorted(a_pos + b_pos, key=by_text)), tuple(sorted(a_neg + b_neg, key=by_text)), value)
+
+
+def _splits(nums: Numbers) -> Iterable[tuple[Numbers, Numbers]]:
+    """every way to split a multiset into two non-empty parts, each unordered pair once"""
+    n = len(nums)
+    seen = set()
+    for size in range(1, n // 2 + 1):
+        for picked in combinations(range(n), size):
+            left = tuple(nums[i] for i in picked)
+            right = tuple(nums[i] for i in range(n) if i not in picked)
+            if size * 2 == n and right < left:
+                left, right = right, left
+            if (left, right) not in seen:
+                seen.add((left, right))
+                yield left, right
+
+
+@lru_cache(maxsize=4096)
+def _reachable(nums: Numbers) -> frozenset[Fraction]:
+    if len(nums) == 1:
+        return frozenset(nums)
+    values = set()
+    for left, right in _splits(nums):
+        right_values = _reachable(right)
+        for a in _reachable(left):
+            for b in right_values:
+                values.update((a + b, a - b, b - a, a * b))
+                if b:
+                    values.add(a / b)
+                if a:
+                    values.add(b / a)
+    return frozenset(values)
+
+
+@lru_cache(maxsize=4096)
+def _exprs(nums: Numbers, value: Fraction) -> tuple[Expr, ...]:
+    """every distinct canonical expression of ``nums`` that equals ``value``"""
+    if len(nums) == 1:
+        return (Expr.number(value),) if nums[0] == value else ()
+    found: dict[str, Expr] = {}
+
+    def add(op: str, first: tuple[Numbers, Fraction], second: tuple[Numbers, Fraction], invert: bool):
+        for a in _exprs(*first):
+            for b in _exprs(*second):
+                expr = _combine(op, a, b, invert, value)
+                found.setdefault(expr.text, expr)
+
+    for left, right in _splits(nums):
+        right_values = _reachable(right)
+        for a in _reachable(left):
+            # for each value of one side, work out what the other side needs to be instead of trying them all
+            if value - a in right_values:
+                add('+', (left, a), (right, value - a), False)
+            if a - value in right_values:
+                add('+', (left, a), (right, a - value), True)
+            if value + a in right_values:
+                add('+', (right, value + a), (left, a), True)
+            if a:
+                if value / a in right_values:
+                    add('*', (left, a), (right, value / a), False)
+                if value and a / value in right_values:
+                    add('*', (left, a), (right, a / value), True)
+                if value * a in right_values:
+                    add('*', (right, value * a), (left, a), True)
+            elif not value:  # 0 * anything, 0 / anything non-zero
+                for b in right_values:
+                    add('*', (left, a), (right, b), False)
+                    if b:
+                        add('*', (left, a), (right, b), True)
+    return tuple(found.values())
+
+
+def _numbers(nums: Iterable[int | Fraction]) -> Numbers:
+    return tuple(sorted(map(Fraction, nums)))
+
+
+def reachable(nums: Iterable[int | Fraction]) -> frozenset[Fraction]:
+    """every value that can be made with all of ``nums``"""
+    return _reachable(_numbers(nums))
+
+
+def has_solution(nums: Iterable[int | Fraction], target: int | Fraction = 24) -> bool:
+    return Fraction(target) in reachable(nums)
+
+
+def solve(nums: Iterable[int | Fraction], target: int | Fraction = 24) -> list[str]:
+    """every distinct (up to commutativity and associativity) way to make ``target`` with all of ``nums``, sorted"""
+    nums, target = _numbers(nums), Fraction(target)
+    if target not in _reachable(nums):
+        return []
+    return sorted(expr.text for expr in _exprs(nums, target))
+
+
+if __name__ == '__main__':
+    from itertools import combinations_with_replacement
+    from timeit import timeit
+
+    def _old_solve(num: list, how: list, target: int):  # the previous solver, minus the string formatting
+        if len(num) == 1:
+            if num[0] == target:
+                yield str(how[0])
+            return
+        ops = {'+': lambda a, b: a + b, '-': lambda a, b: a - b, '*': lambda a, b: a * b,
+               '/': lambda a, b: a / b if b != 0 else 9999999}
+        for i, n1 in enumerate(num):
+            for j, n2 in enumerate(num):
+                if i != j:
+                    rest = [k for k in range(len(num)) if k != i and k != j]
+                    for sym, op in ops.items():
+                        yield from _old_solve([num[k] for k in rest] + [op(n1, n2)],
+                                              [how[k] for k in rest] + [(how[i], sym, how[j])], target)
+
+    def _old_find_solutions(nums: list[int], target: int = 24) -> list[str]:
+        return list(set(_old_solve([Fraction(i) for i in nums], nums, target)))
+
+    def _new_find_solutions(nums: list[int], target: int = 24) -> list[str]:
+        _reachable.cache_clear()  # no help from earlier questions, to keep it fair
+        _exprs.cache_clear()
+        return solve(nums, target)
+
+    questions = [list(q) for q in combinations_with_replacement(range(1, 10), 4)][::10]
+    old_count = sum(len(_old_find_solutions(q)) for q in questions)
+    new_count = sum(len(_new_find_solutions(q)) for q in questions)
+    for q in questions:
+        assert bool(_old_find_solutions(q)) == bool(_new_find_solutions(q)), q
+    old_t = timeit(lambda: [_old_find_solutions(q) for q in questions], number=1) / len(questions)
+    new_t = timeit(lambda: [_new_find_solutions(q) for q in questions], number=1) / len(questions)
+    print(f'{len(questions)} questions: old {old_t * 1000:.2f} ms/question ({old_count} "distinct" solutions), '
+          f'new {new_t * 1000:.2f} ms/question ({new_count} distinct solutions), {old_t / new_t:.1f}x faster')
+
+    for nums, target in (([1, 2, 3, 4, 5], 100), ([3, 3, 8, 8, 9], 24), ([1, 2, 3, 5, 7], Fraction(7, 3))):
+        _reachable.cache_clear()
+        _exprs.cache_clear()
+        t = timeit(lambda: solve(nums, target), number=1)
+        print(f'{nums} -> {target}: {len(solve(nums, target))} solutions in {t * 1000:.1f} ms')
@@ -6,11 +6,6 @@ from discord.ext.commands import CommandError, Context, Group, MissingRequiredAr
 
 from botcord.ext.commands import Cog
 
-try:
-    from ..messagehook.messagehook import MessageHook  # nice import name
-except ImportError:  # if MessageHook extension is not installed
-    MessageHook = None
-
 if TYPE_CHECKING:
     from botcord import BotClient
 
@@ -71,8 +66,10 @@ class MineSweeper(Cog):
         board_text.lstrip('\n')
 
         # try to send using a webhook for custom pfp
-        if MessageHook is not None:  # cross-extension dependency
-            await MessageHook.send(
+        # cross-extension dependency, duck-typed since a reloaded MessageHook is a new class
+        hook_cog = self.bot.get_cog('MessageHook')
+        if hook_cog is not None and hasattr(hook_cog, 'send'):
+            await hook_cog.send(
                     ctx.channel,
                     board_text,
                     'MineSweeper Bot',
@@ -1,12 +1,11 @@
 """24 but twenty_four because python symbols can't start with a number"""
 
-from asyncio import CancelledError, Future, TimeoutError, ensure_future
+from asyncio import CancelledError, Future, TimeoutError, ensure_future, to_thread
 from contextlib import suppress
 from datetime import datetime
-from fractions import Fraction
 from operator import add, mul, sub, truediv
 from random import randint
-from typing import Final, Iterator, Optional, TYPE_CHECKING
+from typing import Final, TYPE_CHECKING
 
 import math
 from discord import Message
@@ -16,6 +15,8 @@ from time import time
 from botcord.ext.commands import Cog
 from botcord.functions import smart_time_s
 from botcord.utils import MathParser
+from . import arith_solver
+from .twenty_four_table import SolutionTable, build_table
 
 if TYPE_CHECKING:
     from botcord import BotClient
@@ -35,6 +36,20 @@ class TwentyFour(Cog):
         self.parser = MathParser(allowed_operations={add, mul, sub, truediv})
         self.pending_games: dict[int, Future] = {}  # ids of question messages that aren't answerded yet and their waiting listeners
         self.wait_time: Final[int] = 300  # 5 minutes
+        self.table: SolutionTable | None = None  # solutions to every question, once loaded or built
+
+    async def __init_async__(self):
+        self.table = await to_thread(SolutionTable.load)
+        if self.table is None:  # first run or outdated; building takes a while, so don't hold up startup
+            self.bot.task_keeper.run_coro(self._build_table())
+
+    async def _build_table(self):
+        if self.bot.process_pool is not None:
+            solutions = await self.bot.to_process(build_table, TwentyFour.find_solutions)
+        else:
+            solutions = await to_thread(build_table, TwentyFour.find_solutions)
+        self.table = SolutionTable(solutions)
+        await to_thread(self.table.save)
 
     def complete_game(self, q_msg_id: int):
         """remove the "game" from self.pending_games
@@ -57,7 +72,10 @@ class TwentyFour(Cog):
     @twenty_four.command(aliases=['q', 'generate'])
     async def new(self, ctx: Context):
         """Generate a 24-game question with valid solutions"""
-        question = await self.bot.to_process(TwentyFour._new_q)  # subprocess offloading
+        if self.table is not None:
+            question = self.table.new_question()
+        else:
+            question = await self.bot.to_process(TwentyFour._new_q)  # subprocess offloading
         q_msg: Message = await ctx.reply(f'`{" ".join(str(i) for i in question)}`')
 
         # and, wait for an answer
@@ -104,7 +122,10 @@ class TwentyFour(Cog):
     @twenty_four.command(aliases=['reveal'], ignore_extra=False)
     async def solve(self, ctx: Context, a: int, b: int, c: int, d: int):
         """Find solutions to a 24-game question"""
-        answers = await self.bot.to_process(TwentyFour.find_solutions, [a, b, c, d])  # subprocess offloading
+        if self.table is not None and [a, b, c, d] in self.table:
+            answers = self.table.find_solutions([a, b, c, d])
+        else:
+            answers = await self.bot.to_process(TwentyFour.find_solutions, [a, b, c, d])  # subprocess offloading
         if answers:
             count = len(answers)
             await ctx.reply(f'`{answers[0]}`{f"... and {count - 1} more" if count > 1 else ""}')
@@ -217,7 +238,6 @@ class TwentyFour(Cog):
                 else:  # massive skill issue.
                     return False, f'`{val}` is definitely not `24`; try harder.'
 
-    # Computationally Intensive, lazy no brain implementation
     @staticmethod
     def _new_q() -> list[int]:
         q = [randint(0, 9) for _ in range(4)]
@@ -227,52 +247,15 @@ class TwentyFour(Cog):
             possible = TwentyFour.has_solution(q)
         return q
 
-    # Actual algorithms below
-    OPS: Final = {mul                                      : '*', sub: '-', add: '+',
-                  lambda a, b: a / b if b != 0 else 9999999: '/'}  # special div to avoid division by zero
-
-    # Computationally Intensive
+    # Actual algorithms below; see arith_solver
     @staticmethod
     def has_solution(nums: list[int], target: int = 24) -> bool:
-        if len(nums) == 1:
-            if math.isclose(nums[0], target):
-                return True
-
-        for i in range(len(nums)):
-            for j in range(len(nums)):
-                if i != j:
-                    for op in TwentyFour.OPS:
-                        if nums[j]:
-                            if TwentyFour.has_solution([op(nums[i], nums[j])] +
-                                                       [nums[k] for k in range(len(nums)) if k not in (i, j)]):
-                                return True
-
-    # Computationally Intensive
-    @staticmethod
-    def _solve(num: list[Fraction], how: list, target: int) -> Iterator[Optional[str]]:
-        if len(num) == 1:
-            if num[0] == target:
-                # hacky way to parse how into string
-                yield str(how[0]).replace(',', '').replace("'", '').strip().removeprefix('(').removesuffix(')')
-        else:
-            for i, n1 in enumerate(num):
-                for j, n2 in enumerate(num):
-                    if i != j:  # for "every pair of two numbers in num":
-                        for op in TwentyFour.OPS:  # do each of the operations...
-                            # "Spectators" are the unchanged numbers (because we only operate on two at a time)
-                            spectator_nums = [n for k, n in enumerate(num) if k != i and k != j]
-                            spectator_hows = [h for k, h in enumerate(how) if k != i and k != j]
-
-                            new_num = spectator_nums + [op(n1, n2)]  # Operate on two numbers
-                            new_how = spectator_hows + [(how[i], TwentyFour.OPS[op], how[j])]
-
-                            yield from TwentyFour._solve(new_num, new_how, target)
+        return arith_solver.has_solution(nums, target)
 
-    # Computationally Intensive, driver function of _solve()
     @staticmethod
-    def find_solutions(num: list[int], target: int = 24) -> list[Optional[str]]:
-        frac = [Fraction(i) for i in num]
-        return list(set(TwentyFour._solve(frac, num, target)))
+    def find_solutions(num: list[int], target: int = 24) -> list[str]:
+        """distinct solutions (up to commutativity and associativity)"""
+        return arith_solver.solve(num, target)
 
 
 async def setup(bot: 'BotClient'):
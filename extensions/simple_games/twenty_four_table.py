@@ -0,0 +1,76 @@
+"""
+Precomputed solutions to every 24-game question.
+
+A question is four digits from 0-9 in any order, so there are only 715 distinct ones.
+They are all solved once and the results are kept in a file next to this module.
+After that, generating and solving questions are just table lookups.
+"""
+
+import json
+import os
+from collections.abc import Callable, Iterable
+from itertools import combinations_with_replacement
+from random import randint
+
+__all__ = ['SolutionTable', 'build_table', 'TABLE_VERSION', 'DEFAULT_PATH']
+
+TABLE_VERSION = 2  # bump whenever the solver's output changes, so that saved tables get rebuilt
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), 'twenty_four_table.json')
+
+Key = tuple[int, ...]
+
+
+def key(nums: Iterable[int]) -> Key:
+    return tuple(sorted(nums))
+
+
+def build_table(solver: Callable[[list[int], int], list[str]], target: int = 24) -> dict[Key, list[str]]:
+    """solutions (sorted) to every multiset of four digits, using ``solver(nums, target)``"""
+    return {q: sorted(solver(list(q), target)) for q in combinations_with_replacement(range(10), 4)}
+
+
+class SolutionTable:
+    """Solutions to every 24-game question, looked up regardless of the order of the numbers"""
+
+    def __init__(self, solutions: dict[Key, list[str]]):
+        self.solutions = solutions
+
+    def __contains__(self, nums: Iterable[int]) -> bool:
+        """whether ``nums`` is a question covered by the table"""
+        return key(nums) in self.solutions
+
+    def find_solutions(self, nums: Iterable[int]) -> list[str]:
+        return self.solutions[key(nums)]
+
+    def count(self, nums: Iterable[int]) -> int:
+        return len(self.solutions[key(nums)])
+
+    def has_solution(self, nums: Iterable[int]) -> bool:
+        return bool(self.solutions[key(nums)])
+
+    def new_question(self) -> list[int]:
+        """four random digits that have a solution"""
+        # rejection sampling keeps the same distribution as the old draw-and-brute-force loop,
+        # and about 70% of draws are solvable, so it takes only a lookup or two
+        while not self.has_solution(q := [randint(0, 9) for _ in range(4)]):
+            pass
+        return q
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PATH) -> 'SolutionTable | None':
+        """the table saved at ``path``; None if there isn't one or it was made by another version"""
+        try:
+            with open(path, encoding='utf-8') as file:
+                saved = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not isinstance(saved, dict) or saved.get('version') != TABLE_VERSION:
+            return None
+        return cls({tuple(map(int, q.split())): solutions for q, solutions in saved['solutions'].items()})
+
+    def save(self, path: str = DEFAULT_PATH):
+        data = {'version': TABLE_VERSION,
+                'solutions': {' '.join(map(str, q)): solutions for q, solutions in self.solutions.items()}}
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(data, file, separators=(',', ':'))
+        os.replace(path + '.tmp', path)
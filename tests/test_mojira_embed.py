@@ -0,0 +1,88 @@
+import unittest
+from types import SimpleNamespace
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from botcord.http import WebClient
+from extensions.adv_replies.mojira_embed import Mojira
+
+ISSUE_PAGE = '''<html><body>
+<h1 id="summary-val">{key} from the page</h1>
+<span id="status-val">Open</span><span id="resolution-val">Unresolved</span>
+<div id="description-val"><p>scraped</div>
+</body></html>'''
+
+
+def api_issue(key: str) -> dict:
+    return {'key': key, 'fields': {
+        'summary': f'{key} from the search', 'description': 'searched', 'status': {'name': 'Resolved'},
+        'issuetype': {'name': 'Bug'}, 'resolution': {'name': 'Fixed'}, 'fixVersions': [{'name': '1.21'}],
+        'created': '2022-08-17T20:00:00.000+0000', 'updated': '2022-08-18T09:05:00.000+0000',
+        'resolutiondate': None, 'reporter': {'displayName': 'Someone'}, 'assignee': None,
+        'customfield_12200': {'value': 'Normal'}, 'votes': {'votes': 3}, 'watches': {'watchCount': 2},
+    }}
+
+
+class SearchEmbedsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.searches: list[str] = []
+        self.pages: list[str] = []
+        self.searchable = {'MC-1', 'MC-2'}  # MC-3 only has an issue page, as if the search left it out
+        self.search_down = False
+
+        async def search(request: web.Request) -> web.Response:
+            self.searches.append(request.query['jql'])
+            if self.search_down:
+                return web.Response(status=503)
+            keys = request.query['jql'].removeprefix('key in (').removesuffix(')').split(',')
+            return web.json_response({'issues': [api_issue(k) for k in keys if k in self.searchable]})
+
+        async def browse(request: web.Request) -> web.Response:
+            self.pages.append(key := request.match_info['key'])
+            return web.Response(text=ISSUE_PAGE.format(key=key), content_type='text/html')
+
+        app = web.Application()
+        app.router.add_get('/rest/api/2/search', search)
+        app.router.add_get('/browse/{key}', browse)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.session = ClientSession()
+        bot = SimpleNamespace(web_client=WebClient(self.session), process_pool=None)
+        self.cog = Mojira(bot)
+        self.cog.local_config['api'] = {'enabled': True, 'base_url': str(self.server.make_url('')).rstrip('/'),
+                                        'timeout': 5}
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.server.close()
+
+    async def test_one_search_for_uncached_issues(self):
+        embeds = await self.cog.get_embeds(['MC-1', 'MC-2', 'MC-1'])
+        self.assertEqual(len(self.searches), 1)
+        self.assertEqual(sorted(self.searches[0].removeprefix('key in (').removesuffix(')').split(',')),
+                         ['MC-1', 'MC-2'])
+        self.assertEqual(self.pages, [])
+        self.assertEqual([e['title'] for e in embeds],
+                         ['MC-1 from the search', 'MC-2 from the search', 'MC-1 from the search'])
+
+        await self.cog.get_embeds(['MC-1', 'MC-2'])  # all cached now
+        self.assertEqual(len(self.searches), 1)
+
+    async def test_pages_for_issues_missing_from_search(self):
+        embeds = await self.cog.get_embeds(['MC-1', 'MC-3'])
+        self.assertEqual(len(self.searches), 1)
+        self.assertEqual(self.pages, ['MC-3'])
+        self.assertEqual(embeds[0]['title'], 'MC-1 from the search')
+        self.assertEqual(embeds[1]['title'], 'MC-3 from the page')
+        self.assertEqual(embeds[1]['description'], 'scraped')
+
+    async def test_pages_when_search_fails(self):
+        self.search_down = True
+        embeds = await self.cog.get_embeds(['MC-1', 'MC-2'])
+        self.assertEqual(len(self.searches), 1)
+        self.assertEqual(sorted(self.pages), ['MC-1', 'MC-2'])
+        self.assertEqual([e['title'] for e in embeds], ['MC-1 from the page', 'MC-2 from the page'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from extensions.adv_replies.mojira_parse import FIELDS, IssueNotViewable, extract_issue
+
+# a trimmed issue page the way Jira renders it: descriptions are user markup,
+# where <p> and <li> are routinely left unclosed
+PAGE = '''<html><head><meta charset="utf-8"><title>[MC-4] Item drops sometimes appear</title></head><body>
+<header><h1 id="summary-val">Item drops sometimes appear at the wrong location</h1></header>
+<ul class="property-list">
+<li><strong>Status:</strong> <span id="status-val"><span class="jira-issue-status-lozenge">Resolved</span></span>
+<li><strong>Type:</strong> <span id="type-val"><img src="bug.svg" alt=""> Bug</span>
+<li><strong>Resolution:</strong> <span id="resolution-val">Fixed</span>
+</ul>
+<div id="description-val" class="user-content-block">
+<p>Dropped items render <b>one block</b> off.
+<p>Steps to reproduce:<br>
+<ol><li>Drop an item<li>Look at it</ol>
+<table><tr><td>expected<td>actual</table>
+</div>
+<div id="peoplemodule">
+<span id="reporter-val"><span class="user-hover">Someone</span></span>
+<span id="assignee-val">Unassigned</span>
+</div>
+<p>Some trailing text that belongs to no field
+</body></html>'''
+
+
+class ExtractIssueTest(unittest.TestCase):
+    def test_unclosed_tags_in_description(self):
+        issue = extract_issue(PAGE)
+        self.assertEqual(issue['title'], 'Item drops sometimes appear at the wrong location')
+        self.assertEqual(issue['status'], 'Resolved')
+        self.assertEqual(issue['issue_type'], 'Bug')
+        self.assertEqual(issue['resolution'], 'Fixed')
+        # ends at its own </div>, not swallowing the people module or the trailing <p>
+        self.assertTrue(issue['desc'].startswith('Dropped items render one block off.'))
+        self.assertTrue(issue['desc'].endswith('expectedactual'))
+        self.assertNotIn('Someone', issue['desc'])
+        self.assertEqual(issue['reporter'], 'Someone')
+        self.assertEqual(issue['assignee'], 'Unassigned')
+        self.assertEqual(issue['fixed_ver'], 'N/A')
+
+    def test_unclosed_capture_at_end_of_page(self):
+        issue = extract_issue('<div id="description-val"><p>cut off', {'desc': ('div', 'description-val')})
+        self.assertEqual(issue, {'desc': 'cut off'})
+
+    def test_nested_same_tag(self):
+        page = '<span id="status-val"><span>Open</span> (reopened)</span><span>other</span>'
+        self.assertEqual(extract_issue(page, {'status': ('span', 'status-val')}), {'status': 'Open (reopened)'})
+
+    def test_void_field(self):
+        page = '<img id="avatar"><span id="status-val">Open</span>'
+        fields = {'avatar': ('img', 'avatar'), 'status': ('span', 'status-val')}
+        self.assertEqual(extract_issue(page, fields), {'avatar': '', 'status': 'Open'})
+
+    def test_not_viewable(self):
+        with self.assertRaises(IssueNotViewable):
+            extract_issue('<div class="error-image error-image-canNotBeViewed"></div>')
+        with self.assertRaises(IssueNotViewable):
+            extract_issue('<form id="login-form"></form>')
+
+    def test_all_fields_reported(self):
+        self.assertEqual(set(extract_issue(PAGE)), set(FIELDS))
+
+
+if __name__ == '__main__':
+    unittest.main()